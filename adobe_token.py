@@ -0,0 +1,97 @@
+import threading
+import time
+
+# Process-wide bearer token cache for the Adobe PDF Services API.
+# Every conversion in this process shares one token. It is refreshed on a background
+# timer shortly before it expires, and when a caller does find it expired (e.g. the
+# timer failed) only one thread calls /token while the others wait for its result.
+
+TOKEN_REFRESH_MARGIN_SECONDS = 300  # refresh this long before the token expires
+TOKEN_RETRY_SECONDS = 30  # background retry delay after a failed refresh
+
+
+class AdobeTokenProvider:
+    def __init__(self, fetch_token):
+        # fetch_token() -> (access_token, expires_in_seconds)
+        self._fetch_token = fetch_token
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+        self._timer = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def _valid_token(self):
+        if self._token and time.monotonic() < self._expires_at - TOKEN_REFRESH_MARGIN_SECONDS:
+            return self._token
+        return None
+
+    def get_token(self):
+        with self._lock:
+            token = self._valid_token()
+            if token:
+                self.hits += 1
+                return token
+            self.misses += 1
+
+        # Single flight: whoever gets the refresh lock first fetches, the rest reuse it
+        with self._refresh_lock:
+            with self._lock:
+                token = self._valid_token()
+            if token:
+                return token
+            return self._refresh()
+
+    def _refresh(self):
+        try:
+            token, expires_in = self._fetch_token()
+        except Exception:
+            with self._lock:
+                self.refresh_failures += 1
+            raise
+
+        with self._lock:
+            self._token = token
+            self._expires_at = time.monotonic() + expires_in
+            self.refreshes += 1
+        self._schedule(max(expires_in - 2 * TOKEN_REFRESH_MARGIN_SECONDS, TOKEN_RETRY_SECONDS))
+        return token
+
+    def _schedule(self, delay):
+        timer = threading.Timer(delay, self._background_refresh)
+        timer.daemon = True
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = timer
+        timer.start()
+
+    def _background_refresh(self):
+        with self._refresh_lock:
+            try:
+                self._refresh()
+            except Exception as e:
+                print(f"⚠️ Background Adobe token refresh failed: {e}")
+                self._schedule(TOKEN_RETRY_SECONDS)
+
+    def invalidate(self, token=None):
+        """Drop the cached token (e.g. after a 401), unless it was already replaced."""
+        with self._lock:
+            if token is None or token == self._token:
+                self._token = None
+                self._expires_at = 0.0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                "expires_in_seconds": max(self._expires_at - time.monotonic(), 0.0) if self._token else 0.0,
+            }
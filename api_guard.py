@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import deque
+from conversion_errors import CircuitOpenError, ConversionTimeoutError
+
+# Process-wide protection for the PDF Services API.
+# FairRateLimiter is a token bucket sized to the API quota. Callers wait in one FIFO
+# queue per priority class and the highest class is served first, so interactive
+# previews are not stuck behind a batch of admin uploads; a waiter that has been
+# queued for LIMITER_PROMOTE_AFTER_SECONDS is served next whatever its class, so
+# lower classes still make progress. CircuitBreaker counts consecutive throttled
+# (429) or failed (5xx) responses and, once tripped, rejects calls immediately until
+# CIRCUIT_RESET_SECONDS have passed, then lets a single probe call through.
+
+API_RATE_PER_SECOND = 5.0
+API_BURST = 10
+LIMITER_MAX_WAIT_SECONDS = 30
+LIMITER_PROMOTE_AFTER_SECONDS = 10
+PRIORITIES = ("interactive", "admin", "background")  # highest first
+
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_SECONDS = 30
+
+
+class FairRateLimiter:
+    def __init__(self, rate=API_RATE_PER_SECOND, burst=API_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._condition = threading.Condition()
+        self._waiters = {priority: deque() for priority in PRIORITIES}
+        self.granted = {priority: 0 for priority in PRIORITIES}
+        self.waited = {priority: 0.0 for priority in PRIORITIES}
+        self.timeouts = 0
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _next_waiter(self, now):
+        for priority in PRIORITIES:
+            queue = self._waiters[priority]
+            if queue and now - queue[0][0] >= LIMITER_PROMOTE_AFTER_SECONDS:
+                return queue[0]
+        for priority in PRIORITIES:
+            if self._waiters[priority]:
+                return self._waiters[priority][0]
+        return None
+
+    def acquire(self, priority="interactive", timeout=LIMITER_MAX_WAIT_SECONDS):
+        """Block until a request may be sent; raises ConversionTimeoutError after timeout."""
+        queue = self._waiters[priority]
+        enqueued = time.monotonic()
+        ticket = (enqueued, object())
+        with self._condition:
+            queue.append(ticket)
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._next_waiter(now) is ticket and self._tokens >= 1:
+                    self._tokens -= 1
+                    queue.remove(ticket)
+                    self.granted[priority] += 1
+                    self.waited[priority] += now - enqueued
+                    self._condition.notify_all()
+                    return
+
+                remaining = enqueued + timeout - now
+                if remaining <= 0:
+                    queue.remove(ticket)
+                    self.timeouts += 1
+                    self._condition.notify_all()
+                    raise ConversionTimeoutError(f"No PDF API capacity within {timeout:.0f}s ({priority})")
+                # Whoever is at the head sleeps until the next token; the rest until notified
+                next_token = max((1 - self._tokens) / self.rate, 0.01)
+                self._condition.wait(min(next_token, remaining))
+
+    def stats(self):
+        with self._condition:
+            return {
+                priority: {
+                    "waiting": len(self._waiters[priority]),
+                    "granted": self.granted[priority],
+                    "mean_wait_seconds": self.waited[priority] / self.granted[priority] if self.granted[priority] else 0.0,
+                }
+                for priority in PRIORITIES
+            }
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self.trips = 0
+        self.rejected = 0
+
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return "closed"
+        if now - self._opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def retry_in(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(self._opened_at + self.reset_seconds - time.monotonic(), 0.0)
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go out now."""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == "closed":
+                return
+            if state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"PDF API circuit open, retry in {self.retry_in():.0f}s")
+
+    def cancel_probe(self):
+        """The call allowed by before_call() was never sent."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record(self, status_code):
+        """Feed the outcome of a call (HTTP status, or None for a connection failure)."""
+        failed = status_code is None or status_code == 429 or status_code >= 500
+        with self._lock:
+            self._probe_in_flight = False
+            if not failed:
+                self._failures = 0
+                self._opened_at = None
+                return
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    self.trips += 1
+                    print(f"⚠️ PDF API circuit opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self._state(time.monotonic()),
+                "consecutive_failures": self._failures,
+                "trips": self.trips,
+                "rejected": self.rejected,
+            }
+
+
+api_limiter = FairRateLimiter()
+api_breaker = CircuitBreaker()
@@ -0,0 +1,145 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+
+# Background deletion of Adobe PDF Services assets.
+# A conversion only needs its uploaded asset until the PDF is downloaded, so instead of
+# waiting for DELETE /assets/{id}, main_converter enqueues the asset id here and returns.
+# The queue is a small SQLite table so ids enqueued before a restart are still deleted
+# afterwards. A worker thread drains it in batches of ASSET_DELETE_BATCH_SIZE; failed
+# deletions are retried with exponential backoff and dropped after ASSET_DELETE_MAX_ATTEMPTS
+# (Adobe expires assets on its own after 24 hours).
+
+ASSET_CLEANUP_DB = os.path.join(tempfile.gettempdir(), "hvt_asset_cleanup.sqlite3")
+ASSET_DELETE_BATCH_SIZE = 20
+ASSET_DELETE_MAX_ATTEMPTS = 8
+ASSET_DELETE_BACKOFF_SECONDS = 5
+ASSET_DELETE_MAX_BACKOFF_SECONDS = 15 * 60
+ASSET_CLEANUP_IDLE_SECONDS = 30  # wake up at least this often to pick up retries
+ASSET_CLAIM_SECONDS = 120  # rows being deleted are hidden from other workers this long
+
+
+class AssetCleanupQueue:
+    def __init__(self, delete_asset, db_path=ASSET_CLEANUP_DB):
+        # delete_asset(asset_id) raises on failure
+        self._delete_asset = delete_asset
+        self.db_path = db_path
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.deleted = 0
+        self.failures = 0
+        self.dropped = 0
+        with closing(self._connect()) as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS pending_asset_deletes ("
+                " asset_id TEXT PRIMARY KEY,"
+                " enqueued_at REAL NOT NULL,"
+                " next_attempt_at REAL NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " last_error TEXT)"
+            )
+
+    def _connect(self):
+        # isolation_level=None: transactions are explicit (BEGIN IMMEDIATE when claiming)
+        db = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def enqueue(self, asset_id):
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute(
+                "INSERT OR IGNORE INTO pending_asset_deletes (asset_id, enqueued_at, next_attempt_at)"
+                " VALUES (?, ?, ?)", (asset_id, now, now)
+            )
+        self.start()
+        self._wakeup.set()
+
+    def start(self):
+        """Start the worker thread once per process (also drains ids left by a restart)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="asset-cleanup", daemon=True)
+                self._thread.start()
+
+    def _claim_batch(self):
+        now = time.time()
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            rows = db.execute(
+                "SELECT asset_id, attempts FROM pending_asset_deletes WHERE next_attempt_at <= ?"
+                " ORDER BY next_attempt_at LIMIT ?", (now, ASSET_DELETE_BATCH_SIZE)
+            ).fetchall()
+            db.executemany(
+                "UPDATE pending_asset_deletes SET next_attempt_at = ? WHERE asset_id = ?",
+                [(now + ASSET_CLAIM_SECONDS, asset_id) for asset_id, _ in rows]
+            )
+            db.execute("COMMIT")
+            return rows
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def _run(self):
+        while True:
+            try:
+                batch = self._claim_batch()
+            except Exception as e:
+                print(f"⚠️ Asset cleanup queue unavailable: {e}")
+                batch = []
+            if batch:
+                self._process(batch)
+                continue
+            self._wakeup.wait(ASSET_CLEANUP_IDLE_SECONDS)
+            self._wakeup.clear()
+
+    def _process(self, batch):
+        for asset_id, attempts in batch:
+            try:
+                self._delete_asset(asset_id)
+            except Exception as e:
+                self._failed(asset_id, attempts + 1, e)
+                continue
+            with closing(self._connect()) as db:
+                db.execute("DELETE FROM pending_asset_deletes WHERE asset_id = ?", (asset_id,))
+            with self._lock:
+                self.deleted += 1
+
+    def _failed(self, asset_id, attempts, error):
+        with self._lock:
+            self.failures += 1
+        with closing(self._connect()) as db:
+            if attempts >= ASSET_DELETE_MAX_ATTEMPTS:
+                print(f"❌ Giving up deleting Adobe asset {asset_id} after {attempts} attempts: {error}")
+                db.execute("DELETE FROM pending_asset_deletes WHERE asset_id = ?", (asset_id,))
+                with self._lock:
+                    self.dropped += 1
+                return
+            delay = min(ASSET_DELETE_BACKOFF_SECONDS * 2 ** (attempts - 1), ASSET_DELETE_MAX_BACKOFF_SECONDS)
+            delay *= random.uniform(0.8, 1.2)
+            db.execute(
+                "UPDATE pending_asset_deletes SET attempts = ?, next_attempt_at = ?, last_error = ?"
+                " WHERE asset_id = ?", (attempts, time.time() + delay, str(error)[:500], asset_id)
+            )
+
+    def pending(self):
+        with closing(self._connect()) as db:
+            return db.execute("SELECT COUNT(*) FROM pending_asset_deletes").fetchone()[0]
+
+    def stats(self):
+        pending = self.pending()
+        with self._lock:
+            return {
+                "pending": pending,
+                "deleted": self.deleted,
+                "failures": self.failures,
+                "dropped": self.dropped,
+            }
@@ -0,0 +1,69 @@
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from docx_pdf_converter import CONVERTER_BACKENDS, CONVERSION_TIMEOUT_SECONDS, _get_loop
+from deadlines import Deadline
+
+# Compare DOCX -> PDF backends on real templates.
+# Each backend is called directly (the conversion cache is bypassed) so every run is
+# a real conversion. Example:
+#   python benchmark_converters.py templates/*.docx --backends adobe libreoffice --runs 5 --concurrency 4
+
+
+def convert_once(backend, docx_path, timeout):
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf:
+        pdf_path = temp_pdf.name
+    started = time.perf_counter()
+    try:
+        deadline = Deadline(timeout)
+        asyncio.run_coroutine_threadsafe(
+            CONVERTER_BACKENDS[backend](docx_path, pdf_path, deadline), _get_loop()).result()
+        return time.perf_counter() - started, None
+    except Exception as e:
+        return time.perf_counter() - started, e
+    finally:
+        if os.path.exists(pdf_path):
+            os.remove(pdf_path)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def benchmark(backend, docx_paths, runs, concurrency, timeout):
+    jobs = [path for _ in range(runs) for path in docx_paths]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda path: convert_once(backend, path, timeout), jobs))
+    elapsed = time.perf_counter() - started
+
+    durations = [duration for duration, error in results if error is None]
+    errors = [error for _, error in results if error is not None]
+    for error in errors[:3]:
+        print(f"⚠️ {backend}: {error}")
+    if not durations:
+        print(f"❌ {backend}: all {len(jobs)} conversions failed")
+        return
+    print(f"{backend:12s} jobs={len(jobs):4d} failed={len(errors):3d} "
+          f"p50={statistics.median(durations):6.2f}s p95={percentile(durations, 0.95):6.2f}s "
+          f"max={max(durations):6.2f}s throughput={len(durations) / elapsed:5.2f} docs/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the DOCX -> PDF conversion backends")
+    parser.add_argument("docx", nargs="+", help="DOCX files to convert (e.g. downloaded templates)")
+    parser.add_argument("--backends", nargs="+", default=sorted(CONVERTER_BACKENDS), choices=sorted(CONVERTER_BACKENDS))
+    parser.add_argument("--runs", type=int, default=3, help="conversions per file")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=CONVERSION_TIMEOUT_SECONDS)
+    args = parser.parse_args()
+
+    for name in args.backends:
+        # One untimed conversion so process/pool start-up is not counted
+        convert_once(name, args.docx[0], args.timeout)
+        benchmark(name, args.docx, args.runs, args.concurrency, args.timeout)
@@ -0,0 +1,49 @@
+import argparse
+import os
+import tempfile
+from mock_pdf_services import start_mock_server, add_mock_arguments, mock_options_from_args
+
+# End-to-end throughput of the Adobe conversion pipeline against mock_pdf_services.py.
+# Runs the real docx_pdf_converter code (token cache, pooled session, polling,
+# streamed download, background asset cleanup) with N concurrent sessions, each
+# converting one document after another, and reports conversions per second. Example:
+#   python benchmark_pipeline.py --sessions 1 4 8 16 --runs 20 --job-seconds 1.5 --error-rate 0.02
+
+
+def sample_docx():
+    from docx import Document
+
+    document = Document()
+    document.add_heading("Benchmark document", level=1)
+    for i in range(20):
+        document.add_paragraph(f"Paragraph {i}: the quick brown fox jumps over the lazy dog.")
+    path = os.path.join(tempfile.mkdtemp(prefix="pipeline_bench_"), "sample.docx")
+    document.save(path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the conversion pipeline against the mock service")
+    parser.add_argument("docx", nargs="*", help="DOCX files to convert (default: a generated sample)")
+    parser.add_argument("--sessions", nargs="+", type=int, default=[1, 4, 8], help="concurrent sessions to test")
+    parser.add_argument("--runs", type=int, default=10, help="conversions per file and session")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--port", type=int, default=0, help="mock server port (0: any free port)")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(args.port, mock_options_from_args(args))
+    # Must be set before docx_pdf_converter is imported (CONFIG is read at import)
+    os.environ["ADOBE_BASE_URL"] = base_url
+    os.environ.setdefault("ADOBE_CLIENT_ID", "mock-client")
+    os.environ.setdefault("ADOBE_CLIENT_SECRET", "mock-secret")
+    from benchmark_converters import benchmark, convert_once
+
+    docx_paths = args.docx or [sample_docx()]
+    print(f"Mock PDF Services at {base_url}")
+    convert_once("adobe", docx_paths[0], args.timeout)  # token + connection warm-up
+    for sessions in args.sessions:
+        print(f"--- {sessions} concurrent session(s)")
+        benchmark("adobe", docx_paths, args.runs * sessions, sessions, args.timeout)
+    print(f"Mock server: {server.state.stats()}")
+    server.shutdown()
@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+# Compare the old pdfplumber preview rasterization with the PyMuPDF renderer.
+# Each renderer/file pair runs in its own process so the peak RSS reported is that
+# renderer's alone. Pages are rendered the way pdf_view shows them (PIL images at
+# the preview DPI). Example, with a certificate and a merged proposal:
+#   python benchmark_preview.py certificate.pdf merged_proposal.pdf --runs 5
+
+RENDERERS = ("pdfplumber", "fitz")
+
+
+def render_pdfplumber(pdf_path, dpi):
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            page.to_image(resolution=dpi).original.load()
+        return len(pdf.pages)
+
+
+def render_fitz(pdf_path, dpi):
+    from pdf_preview import render_pages
+
+    pages = 0
+    for _, image in render_pages(pdf_path, dpi=dpi):
+        image.load()
+        pages += 1
+    return pages
+
+
+def measure(renderer, pdf_path, runs, dpi):
+    render = render_pdfplumber if renderer == "pdfplumber" else render_fitz
+    render(pdf_path, dpi)  # imports and font loading are not counted
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        pages = render(pdf_path, dpi)
+        durations.append(time.perf_counter() - started)
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024
+    return {
+        "pages": pages,
+        "ms_per_page": min(durations) * 1000 / max(pages, 1),
+        "peak_rss_mb": peak_rss_mb,
+    }
+
+
+def measure_in_subprocess(renderer, pdf_path, runs, dpi):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), pdf_path, "--measure", renderer,
+         "--runs", str(runs), "--dpi", str(dpi)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark PDF preview rendering: pdfplumber vs PyMuPDF")
+    parser.add_argument("pdf", nargs="+", help="PDFs to render (e.g. a certificate and a merged proposal)")
+    parser.add_argument("--renderers", nargs="+", default=list(RENDERERS), choices=RENDERERS)
+    parser.add_argument("--runs", type=int, default=3, help="timed renders per file (best one is reported)")
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--measure", choices=RENDERERS, help=argparse.SUPPRESS)  # child process mode
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.pdf[0], args.runs, args.dpi)))
+        sys.exit(0)
+
+    for pdf_path in args.pdf:
+        print(f"--- {os.path.basename(pdf_path)}")
+        for renderer in args.renderers:
+            try:
+                result = measure_in_subprocess(renderer, pdf_path, args.runs, args.dpi)
+            except subprocess.CalledProcessError as e:
+                print(f"❌ {renderer}: {e.stderr.strip().splitlines()[-1] if e.stderr.strip() else e}")
+                continue
+            print(f"{renderer:12s} pages={result['pages']:3d} "
+                  f"{result['ms_per_page']:8.1f} ms/page peak_rss={result['peak_rss_mb']:7.1f} MB")
@@ -0,0 +1,192 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+# Persistent on-disk cache for template and preview blobs.
+# Files are content addressed by (storage path, GCS generation), so a cached copy is
+# valid for as long as the generation does not change. The directory is shared by
+# every Streamlit session and worker process on the host: writers take a per-key
+# file lock and publish with an atomic rename, readers never see partial files.
+
+BLOB_CACHE_DIR = os.path.join(tempfile.gettempdir(), "hvt_blob_cache")
+BLOB_CACHE_MAX_BYTES = 512 * 1024 * 1024
+EVICTION_GRACE_SECONDS = 15 * 60  # never evict files used this recently (a session may still need them)
+
+
+class FileLock:
+    """Exclusive lock usable across threads and processes."""
+
+    _thread_locks = {}
+    _thread_locks_guard = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        with self._thread_locks_guard:
+            self._thread_lock = self._thread_locks.setdefault(path, threading.Lock())
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if fcntl:
+            self._fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+
+class DiskCache:
+    """Size-bounded LRU directory cache; recency is tracked through file mtimes."""
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.join(root, "locks"), exist_ok=True)
+
+    def path_for(self, key, suffix=""):
+        return os.path.join(self.root, key[:2], key + suffix)
+
+    def get(self, key, suffix=""):
+        path = self.path_for(key, suffix)
+        try:
+            os.utime(path)  # bump recency for LRU
+        except FileNotFoundError:
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, key, suffix, write_func):
+        """Fill an entry with write_func(tmp_path) unless another writer got there first."""
+        path = self.path_for(key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with FileLock(os.path.join(self.root, "locks", key + ".lock")):
+            if os.path.exists(path):
+                os.utime(path)
+                self.hits += 1
+                return path
+            self.misses += 1
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+            os.close(fd)
+            try:
+                write_func(tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        self.evict()
+        return path
+
+    def evict(self):
+        with FileLock(os.path.join(self.root, "locks", "evict.lock")):
+            entries = []
+            total = 0
+            for dirpath, dirnames, filenames in os.walk(self.root):
+                if os.path.basename(dirpath) == "locks":
+                    continue
+                for name in filenames:
+                    if name.endswith(".part"):
+                        continue
+                    file_path = os.path.join(dirpath, name)
+                    try:
+                        stat = os.stat(file_path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, file_path))
+                    total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            cutoff = time.time() - EVICTION_GRACE_SECONDS
+            for mtime, size, file_path in sorted(entries):
+                if total <= self.max_bytes or mtime > cutoff:
+                    break
+                try:
+                    os.remove(file_path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+blob_cache = DiskCache(BLOB_CACHE_DIR, BLOB_CACHE_MAX_BYTES)
+
+
+def blob_cache_key(storage_path, generation):
+    return hashlib.sha256(f"{storage_path}#{generation}".encode("utf-8")).hexdigest()
+
+
+def fetch_blob(bucket, storage_path, generation=None):
+    """Return a local path holding the blob's bytes, downloading only on a cache miss.
+
+    Pass the generation when it is already known (e.g. from the catalog's BlobIndex)
+    so a hit costs no network call; otherwise one metadata request resolves it.
+    """
+    from google.api_core.exceptions import NotFound
+
+    generation_hint = generation is not None
+    if not generation_hint:
+        blob = bucket.get_blob(storage_path)
+        if blob is None:
+            raise FileNotFoundError(f"Blob not found: {storage_path}")
+        generation = blob.generation
+
+    key = blob_cache_key(storage_path, generation)
+    suffix = os.path.splitext(storage_path)[1]
+
+    cached_path = blob_cache.get(key, suffix)
+    if cached_path:
+        return cached_path
+
+    def download(tmp_path):
+        bucket.blob(storage_path, generation=generation).download_to_filename(tmp_path)
+
+    try:
+        return blob_cache.put(key, suffix, download)
+    except NotFound:
+        if not generation_hint:
+            raise
+        # The listed generation was overwritten since the index was built
+        return fetch_blob(bucket, storage_path)
+
+
+def cached_first_page(pdf_path, resolution=150):
+    """PNG of a cached PDF's first page, rendered once and kept next to the blobs.
+
+    Only files that live in the blob cache are content addressed, so anything else
+    (freshly generated documents) returns None and is rendered by the caller.
+    """
+    if not isinstance(pdf_path, str) or not os.path.abspath(pdf_path).startswith(os.path.abspath(blob_cache.root) + os.sep):
+        return None
+
+    key = hashlib.sha256(f"{os.path.basename(pdf_path)}#page1@{resolution}".encode("utf-8")).hexdigest()
+    cached_path = blob_cache.get(key, ".png")
+    if cached_path:
+        return cached_path
+
+    def render(tmp_path):
+        from pdf_preview import save_page_png
+        save_page_png(pdf_path, tmp_path, dpi=resolution)
+
+    return blob_cache.put(key, ".png", render)
@@ -1,12 +1,45 @@
-from docxtpl import DocxTemplate
-from jinja2 import Environment
+from docx_template_cache import load_template, jinja_env
+from blob_cache import fetch_blob
+
+# Placeholder schema stored on each DOCX template's Firestore document
+PLACEHOLDERS_FIELD = "placeholders"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
 
 def extract_placeholders(docx_path):
 
-    doc = DocxTemplate(docx_path)
-    env = Environment()
-    placeholders = doc.get_undeclared_template_variables(env)
-    return list(placeholders)
+    doc = load_template(docx_path)
+    placeholders = doc.get_undeclared_template_variables(jinja_env)
+    return sorted(placeholders)
+
+
+def missing_placeholders(placeholders, context, implicit=()):
+    """Placeholders the context does not provide; implicit names are filled in by the editor itself."""
+    if not placeholders:
+        return []
+    return sorted(name for name in placeholders if name not in context and name not in implicit)
+
+
+def index_placeholders(firestore_db, bucket, doc_types, only_missing=True):
+    """Compute and store the placeholder schema for every DOCX template; returns (updated, failed)."""
+    updated = 0
+    failed = []
+    for doc_type in doc_types:
+        templates_ref = firestore_db.collection("HVT_DOC_Gen").document(doc_type).collection("templates")
+        for doc in templates_ref.stream():
+            data = doc.to_dict()
+            if data.get("file_type") != DOCX_MIME or not data.get("storage_path"):
+                continue
+            if only_missing and PLACEHOLDERS_FIELD in data:
+                continue
+            try:
+                docx_path = fetch_blob(bucket, data["storage_path"])
+                templates_ref.document(doc.id).update({PLACEHOLDERS_FIELD: extract_placeholders(docx_path)})
+                updated += 1
+            except Exception as e:
+                print(f"❌ Could not index placeholders for {data['storage_path']}: {e}")
+                failed.append(data.get("display_name") or data["storage_path"])
+    return updated, failed
 
 
 # template_path = "app_invoice_1.docx"
@@ -0,0 +1,106 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from blob_cache import DiskCache
+from load_config import SHARED_CONVERSION_CACHE
+
+# Cache of converted PDFs in front of main_converter.
+# The key is a hash of the rendered DOCX with the parts Word/docxtpl change on every
+# save stripped out (docProps timestamps and revision counters, rsid attributes), so
+# rendering the same template with the same data maps to the same PDF. PDFs live in
+# a local size-bounded LRU directory; with SHARED_CONVERSION_CACHE enabled they are
+# also kept in Cloud Storage so other instances can reuse them.
+
+CONVERSION_CACHE_DIR = os.path.join(tempfile.gettempdir(), "hvt_pdf_cache")
+CONVERSION_CACHE_MAX_BYTES = 256 * 1024 * 1024
+SHARED_CACHE_PREFIX = "HVT_DOC_Gen/conversion_cache"
+CACHE_KEY_VERSION = "1"
+
+_VOLATILE_CORE_PROPS = re.compile(
+    rb"<(dcterms:created|dcterms:modified|cp:lastModifiedBy|cp:revision)\b[^>]*?(/>|>.*?</\1>)", re.S)
+_VOLATILE_APP_PROPS = re.compile(rb"<(TotalTime|Application|AppVersion)\b[^>]*?(/>|>.*?</\1>)", re.S)
+_RSID_ATTRIBUTES = re.compile(rb'\sw:rsid\w*="[^"]*"')
+_RSID_TABLE = re.compile(rb"<w:rsids>.*?</w:rsids>", re.S)
+
+
+def _normalize_part(name, data):
+    if name == "docProps/core.xml":
+        return _VOLATILE_CORE_PROPS.sub(b"", data)
+    if name == "docProps/app.xml":
+        return _VOLATILE_APP_PROPS.sub(b"", data)
+    if name.endswith(".xml"):
+        return _RSID_TABLE.sub(b"", _RSID_ATTRIBUTES.sub(b"", data))
+    return data
+
+
+def docx_fingerprint(docx_path, namespace="adobe"):
+    """Stable hash of a DOCX's content, ignoring volatile metadata."""
+    digest = hashlib.sha256(f"{CACHE_KEY_VERSION}:{namespace}".encode("utf-8"))
+    with zipfile.ZipFile(docx_path) as docx:
+        for name in sorted(docx.namelist()):
+            digest.update(name.encode("utf-8") + b"\0")
+            digest.update(hashlib.sha256(_normalize_part(name, docx.read(name))).digest())
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    def __init__(self, root, max_bytes, shared=False):
+        self.local = DiskCache(root, max_bytes)
+        self.shared = shared
+        self._lock = threading.Lock()
+        self.saved = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _shared_blob(self, key):
+        from firebase_conf import bucket
+        return bucket.blob(f"{SHARED_CACHE_PREFIX}/{key}.pdf")
+
+    def get(self, key, output_path):
+        """Copy the cached PDF to output_path; returns True on a hit."""
+        cached_path = self.local.get(key, ".pdf")
+
+        if cached_path is None and self.shared:
+            try:
+                blob = self._shared_blob(key)
+                if blob.exists():
+                    cached_path = self.local.put(key, ".pdf", blob.download_to_filename)
+                    with self._lock:
+                        self.shared_hits += 1
+            except Exception as e:
+                print(f"⚠️ Shared conversion cache unavailable: {e}")
+
+        if cached_path is None:
+            with self._lock:
+                self.misses += 1
+            return False
+
+        shutil.copyfile(cached_path, output_path)
+        with self._lock:
+            self.saved += 1
+        return True
+
+    def put(self, key, pdf_path):
+        self.local.put(key, ".pdf", lambda tmp_path: shutil.copyfile(pdf_path, tmp_path))
+        if self.shared:
+            try:
+                self._shared_blob(key).upload_from_filename(pdf_path, content_type="application/pdf")
+            except Exception as e:
+                print(f"⚠️ Could not store PDF in the shared conversion cache: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.saved + self.misses
+            return {
+                "conversions_saved": self.saved,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_ratio": self.saved / lookups if lookups else 0.0,
+            }
+
+
+conversion_cache = ConversionCache(CONVERSION_CACHE_DIR, CONVERSION_CACHE_MAX_BYTES, shared=SHARED_CONVERSION_CACHE)
@@ -0,0 +1,6 @@
+class ConversionTimeoutError(Exception):
+    """Raised when a conversion does not finish before its deadline."""
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the PDF API while its circuit breaker is open."""
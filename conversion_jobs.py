@@ -0,0 +1,376 @@
+import importlib
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from conversion_errors import CircuitOpenError
+
+try:
+    import fcntl
+except ImportError:  # Windows: no single-worker guarantee, see worker_running()
+    fcntl = None
+
+# Durable render + convert jobs, run outside the Streamlit script.
+# Handlers submit a job keyed by a hash of (template version, form data) and poll its
+# status; a separate worker process (this file run as a script) claims queued jobs
+# from a SQLite table, renders the DOCX, converts it and records the output paths.
+# Submitting the same key twice returns the existing job, and jobs and their files
+# outlive both the Streamlit session and restarts of either process.
+
+CONVERSION_JOBS_DB = os.path.join(tempfile.gettempdir(), "hvt_conversion_jobs.sqlite3")
+CONVERSION_JOBS_DIR = os.path.join(tempfile.gettempdir(), "hvt_conversion_jobs")
+WORKER_LOCK_PATH = CONVERSION_JOBS_DB + ".worker.lock"
+WORKER_CONCURRENCY = 4
+WORKER_POLL_SECONDS = 0.5
+JOB_RETENTION_SECONDS = 24 * 60 * 60
+JOB_MAX_ATTEMPTS = 5  # claims per job: deferrals while the PDF API circuit is open, or worker crashes
+WAIT_STATS_WINDOW = 200  # recent jobs used for the wait time percentiles
+WORKER_RESTART_BACKOFF_SECONDS = 5  # doubled after each worker exit, up to the max
+WORKER_RESTART_MAX_BACKOFF_SECONDS = 5 * 60
+WORKER_STABLE_SECONDS = 60  # a worker that ran this long resets the backoff
+
+# Editors a job may run, as "<module>.<function>"
+DOCX_EDITORS = {
+    "inter_edit.internship_edit",
+    "offer_editor.offer_edit",
+    "releive_editor.relieve_edit",
+    "nda_edit.nda_edit",
+    "invoice_editor.invoice_edit",
+}
+
+
+class ConversionJobQueue:
+    def __init__(self, db_path=CONVERSION_JOBS_DB, jobs_dir=CONVERSION_JOBS_DIR):
+        self.db_path = db_path
+        self.jobs_dir = jobs_dir
+        os.makedirs(jobs_dir, exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS conversion_jobs ("
+                " job_key TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " status TEXT NOT NULL,"  # queued | running | done | failed
+                " created_at REAL NOT NULL,"
+                " started_at REAL,"
+                " finished_at REAL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " result TEXT,"
+                " error TEXT)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS conversion_jobs_status ON conversion_jobs (status, created_at)")
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.row_factory = sqlite3.Row
+        return db
+
+    @staticmethod
+    def _as_job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def job_dir(self, job_key):
+        return os.path.join(self.jobs_dir, job_key)
+
+    def submit(self, job_key, kind, payload):
+        """Queue a job unless one with this key exists; returns the (new or existing) job."""
+        with closing(self._connect()) as db:
+            db.execute(
+                "INSERT OR IGNORE INTO conversion_jobs (job_key, kind, payload, status, created_at)"
+                " VALUES (?, ?, ?, 'queued', ?)",
+                (job_key, kind, json.dumps(payload, default=str), time.time())
+            )
+        return self.get(job_key)
+
+    def retry(self, job_key):
+        with closing(self._connect()) as db:
+            db.execute(
+                "UPDATE conversion_jobs SET status = 'queued', created_at = ?, started_at = NULL,"
+                " finished_at = NULL, result = NULL, error = NULL WHERE job_key = ? AND status != 'running'",
+                (time.time(), job_key)
+            )
+
+    def get(self, job_key):
+        with closing(self._connect()) as db:
+            return self._as_job(db.execute("SELECT * FROM conversion_jobs WHERE job_key = ?", (job_key,)).fetchone())
+
+    def position(self, job_key):
+        """Number of queued jobs ahead of this one."""
+        with closing(self._connect()) as db:
+            return db.execute(
+                "SELECT COUNT(*) FROM conversion_jobs WHERE status = 'queued'"
+                " AND created_at < (SELECT created_at FROM conversion_jobs WHERE job_key = ?)", (job_key,)
+            ).fetchone()[0]
+
+    def claim(self):
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT * FROM conversion_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE conversion_jobs SET status = 'running', started_at = ?, attempts = attempts + 1"
+                    " WHERE job_key = ?", (time.time(), row["job_key"])
+                )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+        return self.get(row["job_key"]) if row is not None else None
+
+    def finish(self, job_key, result):
+        with closing(self._connect()) as db:
+            db.execute(
+                "UPDATE conversion_jobs SET status = 'done', finished_at = ?, result = ? WHERE job_key = ?",
+                (time.time(), json.dumps(result), job_key)
+            )
+
+    def fail(self, job_key, error):
+        with closing(self._connect()) as db:
+            db.execute(
+                "UPDATE conversion_jobs SET status = 'failed', finished_at = ?, error = ? WHERE job_key = ?",
+                (time.time(), str(error)[:1000], job_key)
+            )
+
+    def requeue(self, job_key):
+        """Put a running job back at the end of the queue."""
+        with closing(self._connect()) as db:
+            db.execute(
+                "UPDATE conversion_jobs SET status = 'queued', created_at = ? WHERE job_key = ? AND status = 'running'",
+                (time.time(), job_key)
+            )
+
+    def requeue_orphans(self):
+        """Put jobs left 'running' by a worker that died back in the queue; returns (requeued, failed).
+
+        A job that was claimed JOB_MAX_ATTEMPTS times is failed instead, so a document
+        that crashes the worker (e.g. soffice running out of memory) is not retried forever.
+        """
+        with closing(self._connect()) as db:
+            failed = db.execute(
+                "UPDATE conversion_jobs SET status = 'failed', finished_at = ?, error = ?"
+                " WHERE status = 'running' AND attempts >= ?",
+                (time.time(), f"Conversion worker stopped during each of {JOB_MAX_ATTEMPTS} attempts",
+                 JOB_MAX_ATTEMPTS)
+            ).rowcount
+            requeued = db.execute("UPDATE conversion_jobs SET status = 'queued' WHERE status = 'running'").rowcount
+        return requeued, failed
+
+    def prune(self, max_age=JOB_RETENTION_SECONDS):
+        cutoff = time.time() - max_age
+        with closing(self._connect()) as db:
+            keys = [row["job_key"] for row in db.execute(
+                "SELECT job_key FROM conversion_jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (cutoff,))]
+            for job_key in keys:
+                shutil.rmtree(self.job_dir(job_key), ignore_errors=True)
+                db.execute("DELETE FROM conversion_jobs WHERE job_key = ?", (job_key,))
+        return len(keys)
+
+    def stats(self):
+        now = time.time()
+        with closing(self._connect()) as db:
+            counts = {row[0]: row[1] for row in db.execute(
+                "SELECT status, COUNT(*) FROM conversion_jobs GROUP BY status")}
+            oldest = db.execute("SELECT MIN(created_at) FROM conversion_jobs WHERE status = 'queued'").fetchone()[0]
+            waits = sorted(row[0] for row in db.execute(
+                "SELECT started_at - created_at FROM conversion_jobs WHERE started_at IS NOT NULL"
+                " ORDER BY started_at DESC LIMIT ?", (WAIT_STATS_WINDOW,)))
+        return {
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_queued_seconds": now - oldest if oldest else 0.0,
+            "wait_p50_seconds": waits[len(waits) // 2] if waits else 0.0,
+            "wait_p95_seconds": waits[min(int(len(waits) * 0.95), len(waits) - 1)] if waits else 0.0,
+            "worker_running": worker_running(),
+        }
+
+
+conversion_jobs = ConversionJobQueue()
+
+
+def submit_render_convert(job_key, editor, template_path, context, doc_type=None):
+    """Queue editor(template, docx, context) + PDF conversion; returns the job.
+
+    The template is copied into the job directory so the job does not depend on the
+    session's temporary files. A failed job, or a finished one whose files are gone,
+    is queued again.
+    """
+    editor_name = f"{editor.__module__}.{editor.__name__}"
+    if editor_name not in DOCX_EDITORS:
+        raise ValueError(f"{editor_name} cannot run as a conversion job")
+
+    job_dir = conversion_jobs.job_dir(job_key)
+    job_template = os.path.join(job_dir, "template" + os.path.splitext(template_path)[1])
+    if not os.path.exists(job_template):
+        os.makedirs(job_dir, exist_ok=True)
+        shutil.copyfile(template_path, job_template)
+
+    job = conversion_jobs.submit(job_key, "render_convert", {
+        "editor": editor_name,
+        "template_path": job_template,
+        "context": context,
+        "doc_type": doc_type,
+    })
+    outputs_missing = job["status"] == "done" and not all(os.path.exists(path) for path in job["result"].values())
+    if job["status"] == "failed" or outputs_missing:
+        conversion_jobs.retry(job_key)
+        job = conversion_jobs.get(job_key)
+    return job
+
+
+def _run_render_convert(job_key, payload):
+    from docx_pdf_converter import main_converter
+
+    if payload["editor"] not in DOCX_EDITORS:
+        raise ValueError(f"{payload['editor']} cannot run as a conversion job")
+    module_name, function_name = payload["editor"].rsplit(".", 1)
+    editor = getattr(importlib.import_module(module_name), function_name)
+
+    # Named after the job: the file name becomes the storage name when uploaded
+    job_dir = conversion_jobs.job_dir(job_key)
+    docx_output = os.path.join(job_dir, f"{job_key[:16]}.docx")
+    pdf_output = os.path.join(job_dir, f"{job_key[:16]}.pdf")
+    editor(payload["template_path"], docx_output, payload["context"])
+    main_converter(docx_output, pdf_output, doc_type=payload.get("doc_type"))
+    return {"docx": docx_output, "pdf": pdf_output}
+
+
+JOB_RUNNERS = {
+    "render_convert": _run_render_convert,
+}
+
+
+def _run_job(job):
+    started = time.perf_counter()
+    try:
+        result = JOB_RUNNERS[job["kind"]](job["job_key"], job["payload"])
+    except CircuitOpenError as e:
+        # PDF API unavailable and no fallback converter: queue again once it may be back
+        if job["attempts"] < JOB_MAX_ATTEMPTS:
+            from api_guard import api_breaker
+            print(f"⚠️ Conversion job {job['job_key'][:12]} deferred: {e}")
+            time.sleep(api_breaker.retry_in())
+            conversion_jobs.requeue(job["job_key"])
+            return
+        conversion_jobs.fail(job["job_key"], e)
+        return
+    except Exception as e:
+        print(f"❌ Conversion job {job['job_key'][:12]} failed: {e}")
+        conversion_jobs.fail(job["job_key"], e)
+        return
+    conversion_jobs.finish(job["job_key"], result)
+    print(f"Conversion job {job['job_key'][:12]} done in {time.perf_counter() - started:.2f}s")
+
+
+def run_worker():
+    """Worker process loop; exits at once if another worker already owns the queue."""
+    lock_fd = os.open(WORKER_LOCK_PATH, os.O_CREAT | os.O_RDWR, 0o644)
+    if fcntl:
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            print("Another conversion worker is already running")
+            return
+
+    # Holding the lock means no other worker is alive: anything 'running' was interrupted
+    requeued, failed = conversion_jobs.requeue_orphans()
+    if requeued:
+        print(f"⚠️ Requeued {requeued} interrupted conversion jobs")
+    if failed:
+        print(f"❌ Failed {failed} conversion jobs that interrupted the worker {JOB_MAX_ATTEMPTS} times")
+
+    slots = threading.Semaphore(WORKER_CONCURRENCY)
+    last_prune = 0.0
+    with ThreadPoolExecutor(max_workers=WORKER_CONCURRENCY) as executor:
+        while True:
+            if time.time() - last_prune > 60 * 60:
+                conversion_jobs.prune()
+                last_prune = time.time()
+
+            slots.acquire()
+            try:
+                job = conversion_jobs.claim()
+            except Exception as e:
+                print(f"⚠️ Conversion job queue unavailable: {e}")
+                job = None
+            if job is None:
+                slots.release()
+                time.sleep(WORKER_POLL_SECONDS)
+                continue
+            executor.submit(_run_job, job).add_done_callback(lambda _: slots.release())
+
+
+def worker_running():
+    if fcntl is None:
+        return _worker_process is not None and _worker_process.poll() is None
+    fd = os.open(WORKER_LOCK_PATH, os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)  # closing also releases the lock if we just took it
+    return False
+
+
+_worker_process = None
+_worker_process_lock = threading.Lock()
+_worker_started_at = 0.0
+_worker_next_start = 0.0
+_worker_backoff = WORKER_RESTART_BACKOFF_SECONDS
+
+
+def ensure_worker():
+    """Start the worker process unless one (ours or another instance's) is running.
+
+    Called on every rerun; after our worker exits, the next start waits an increasing
+    backoff so a worker that dies on start-up (e.g. missing secrets) is not respawned
+    on every rerun.
+    """
+    global _worker_process, _worker_started_at, _worker_next_start, _worker_backoff
+    with _worker_process_lock:
+        now = time.monotonic()
+        if _worker_process is not None:
+            exit_code = _worker_process.poll()
+            # Our own worker may still be starting up and not hold the lock yet
+            if exit_code is None:
+                return
+            if now - _worker_started_at >= WORKER_STABLE_SECONDS:
+                _worker_backoff = WORKER_RESTART_BACKOFF_SECONDS
+            print(f"⚠️ Conversion worker exited with code {exit_code}, starting a new one in {_worker_backoff}s")
+            _worker_next_start = now + _worker_backoff
+            _worker_backoff = min(_worker_backoff * 2, WORKER_RESTART_MAX_BACKOFF_SECONDS)
+            _worker_process = None
+        if now < _worker_next_start:
+            return
+        if worker_running():
+            return
+        _worker_process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__)],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        _worker_started_at = now
+
+
+if __name__ == "__main__":
+    run_worker()
@@ -0,0 +1,136 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from conversion_errors import ConversionTimeoutError
+
+# Time budgets and hedged requests for the network stages.
+# A Deadline is created once per conversion (or template mirror run) and passed down;
+# every request gets (connect, read) timeouts capped by what is left of it, so one
+# slow stage cannot run past the end-to-end budget. hedged_call() is for idempotent
+# GETs: when the first attempt is slower than the p95 observed for that stage, a
+# second identical request is sent and whichever answers first is used; the other
+# is cancelled if it has not started, or its response is closed when it arrives.
+
+CONNECT_TIMEOUT_SECONDS = 5
+HEDGE_MIN_SAMPLES = 20  # no hedging until the stage has this many observations
+HEDGE_MIN_DELAY_SECONDS = 0.05
+HEDGE_THREADS = 16
+LATENCY_WINDOW = 200
+
+
+class Deadline:
+    """End-to-end time budget; stages ask it for their timeouts."""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def check(self, stage):
+        if self.remaining() <= 0:
+            raise ConversionTimeoutError(f"Deadline exceeded before {stage}")
+
+    def timeout(self, stage="request", connect=CONNECT_TIMEOUT_SECONDS, read=None):
+        """(connect, read) timeout for requests, capped by the remaining budget."""
+        self.check(stage)
+        remaining = self.remaining()
+        return min(connect, remaining), min(read, remaining) if read else remaining
+
+
+class LatencyTracker:
+    """Recent latencies of one request type, used to decide when to hedge."""
+
+    def __init__(self, name, window=LATENCY_WINDOW):
+        self.name = name
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self.requests += 1
+
+    def count_hedge(self, won=False):
+        with self._lock:
+            if won:
+                self.hedge_wins += 1
+            else:
+                self.hedges += 1
+
+    def p95(self):
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+    def stats(self):
+        p95 = self.p95()
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "p95_seconds": p95,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
+
+
+_hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_THREADS, thread_name_prefix="hedge")
+
+
+def _timed(send, tracker):
+    started = time.monotonic()
+    result = send()
+    tracker.record(time.monotonic() - started)
+    return result
+
+
+def _discard(future):
+    if future.cancel():
+        return
+
+    def close(done):
+        if done.exception() is None and hasattr(done.result(), "close"):
+            done.result().close()
+
+    future.add_done_callback(close)
+
+
+def hedged_call(send, tracker, deadline=None):
+    """send() once, and a second time if the first is slower than tracker's p95; first success wins.
+
+    send must be idempotent and bound its own wait (a timeout), e.g. a GET with timeout=.
+    """
+    def submit():
+        # Each attempt runs in a copy of the caller's context (API priority etc.)
+        return _hedge_pool.submit(contextvars.copy_context().run, _timed, send, tracker)
+
+    futures = [submit()]
+    hedge_after = tracker.p95()
+    if hedge_after is not None:
+        hedge_after = max(hedge_after, HEDGE_MIN_DELAY_SECONDS)
+        done, _ = wait(futures, timeout=hedge_after)
+        if not done and (deadline is None or deadline.remaining() > hedge_after):
+            futures.append(submit())
+            tracker.count_hedge()
+
+    pending = set(futures)
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        succeeded = [future for future in done if future.exception() is None]
+        if succeeded:
+            winner = succeeded[0]
+            for other in succeeded[1:] + list(pending):
+                _discard(other)
+            if len(futures) > 1 and winner is futures[1]:
+                tracker.count_hedge(won=True)
+            return winner.result()
+        error = error or next(iter(done)).exception()
+    raise error
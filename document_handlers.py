@@ -4,12 +4,11 @@ from dateutil.relativedelta import relativedelta
 import pycountry
 import streamlit as st
 from nda_edit import nda_edit
-from docx_pdf_converter import main_converter
+from docx_pdf_converter import main_converter, ConversionTimeoutError, CircuitOpenError, open_pdf
 from edit_proposal_cover_1 import replace_pdf_placeholders
 from merge_pdf import Merger
 import tempfile
 from firebase_conf import auth, rt_db, bucket, firestore_db
-import pdfplumber
 from firebase_admin import storage
 import json
 import base64
@@ -21,10 +20,27 @@ from invoice_editor import invoice_edit
 from testimonial_page_edit import EditTextFile
 from offer_editor import offer_edit
 import re
-from load_config import LOAD_LOCALLY
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from load_config import LOAD_LOCALLY, BACKGROUND_CONVERSIONS
+from conversion_jobs import conversion_jobs, submit_render_convert
+from template_catalog import get_templates, get_blob_index
+from blob_cache import fetch_blob, cached_first_page
+from pdf_preview import render_pages, PREVIEW_DPI
+from check_placeholders import missing_placeholders, PLACEHOLDERS_FIELD
+from thumbnails import THUMBNAILS_FIELD, GALLERY_THUMBNAIL_WIDTH
+from template_downloader import TemplateDownloader, TEMPLATE_MIRROR_DIR
+from proposal_mirror import ProposalTemplateMirror, ProposalTemplateIndex, PROPOSAL_MIRROR_DIR, PROPOSAL_SECTIONS
 
 # LOAD_LOCALLY = False
 
+_proposal_mirror = None
+_proposal_template_index = None
+_proposal_template_sources = None
+# Fetches uncached proposal subcollections concurrently; shared across reruns
+_proposal_catalog_pool = ThreadPoolExecutor(max_workers=len(PROPOSAL_SECTIONS), thread_name_prefix="proposal-catalog")
+
 
 def format_currency_amount(raw_price: str) -> str:
     # Extract digits (optionally include decimal point)
@@ -54,7 +70,11 @@ def save_generated_file_to_firebase_2(
 
         # Upload to Firebase Storage
         blob = bucket.blob(storage_path)
-        blob.upload_from_filename(local_file_path)
+        if file_type == "PDF":
+            with open_pdf(local_file_path) as pdf_handle:
+                blob.upload_from_file(pdf_handle, size=len(pdf_handle), content_type="application/pdf")
+        else:
+            blob.upload_from_filename(local_file_path)
 
         # Get public URL
         download_url = blob.public_url
@@ -78,9 +98,17 @@ def save_generated_file_to_firebase_2(
 
 
 def generate_download_link(file_path, filename, file_type, doc_type):
-    with open(file_path, "rb") as f:
-        file_bytes = f.read()
-        b64 = base64.b64encode(file_bytes).decode()
+    if file_type == "PDF":
+        try:
+            with open_pdf(file_path) as pdf_handle:
+                b64 = base64.b64encode(pdf_handle).decode()
+        except IOError as e:
+            st.error(f"❌ Could not prepare the {doc_type} download: {e}")
+            return
+    else:
+        with open(file_path, "rb") as f:
+            file_bytes = f.read()
+            b64 = base64.b64encode(file_bytes).decode()
 
     href = f'''
     <a href="data:application/pdf;base64,{b64}" download="{filename}"
@@ -105,27 +133,157 @@ def generate_download_link(file_path, filename, file_type, doc_type):
 def pdf_view(file_input):
     try:
 
-        with pdfplumber.open(file_input) as pdf:
-            st.subheader("Preview")
-            for i, page in enumerate(pdf.pages):
-                if LOAD_LOCALLY:
-                    st.image(
-                        page.to_image(resolution=150).original,
-                        caption=f"Page {i + 1}",
-                        use_column_width=True
-                        #use_container_width
-                    )
-                else:
-                    st.image(
-                        page.to_image(resolution=150).original,
-                        caption=f"Page {i + 1}",
-                        use_container_width=True
-                        # use_container_width
-                    )
+        # Cached template previews have their first page pre-rendered
+        first_page = cached_first_page(file_input, resolution=PREVIEW_DPI)
+
+        st.subheader("Preview")
+        if first_page:
+            _show_preview_page(first_page, 0)
+        # MuPDF reads the file itself, so paths are passed straight through
+        for i, image in render_pages(file_input, start=1 if first_page else 0):
+            _show_preview_page(image, i)
     except Exception as e:
         st.warning(f"Couldn't generate PDF preview: {str(e)}")
 
 
+def _show_preview_page(image, i):
+    if LOAD_LOCALLY:
+        st.image(
+            image,
+            caption=f"Page {i + 1}",
+            use_column_width=True
+            #use_container_width
+        )
+    else:
+        st.image(
+            image,
+            caption=f"Page {i + 1}",
+            use_container_width=True
+            # use_container_width
+        )
+
+
+def convert_to_pdf(docx_output, pdf_output, doc_type=None):
+    """main_converter, stopping the page with a message instead of hanging on a stuck job."""
+    try:
+        main_converter(docx_output, pdf_output, doc_type=doc_type)
+    except ConversionTimeoutError as e:
+        st.error(f"⏱️ The PDF service is taking too long right now, please try again in a moment. ({e})")
+        st.stop()
+    except CircuitOpenError as e:
+        st.error(f"🚧 The PDF service is unavailable right now, please try again shortly. ({e})")
+        st.stop()
+
+
+def generate_step3_documents(state_key, template_version, context, editor, template_path, doc_type=None):
+    """Render the DOCX and convert it once per (template version, context).
+
+    editor(template_path, docx_path, context) writes the filled template; returns
+    (docx_path, pdf_path). With BACKGROUND_CONVERSIONS the work runs as a queued job
+    and the page shows its progress until the job is done.
+    """
+    fingerprint = hashlib.sha256(
+        json.dumps([template_version, context], sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+    previous = st.session_state.get(state_key)
+    if (previous and previous["fingerprint"] == fingerprint
+            and os.path.exists(previous["docx"]) and os.path.exists(previous["pdf"])):
+        return previous["docx"], previous["pdf"]
+
+    if BACKGROUND_CONVERSIONS:
+        job_key = hashlib.sha256(f"{doc_type}:{fingerprint}".encode("utf-8")).hexdigest()
+        result = wait_for_conversion_job(submit_render_convert(job_key, editor, template_path, context, doc_type))
+        docx_output, pdf_output = result["docx"], result["pdf"]
+    else:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_docx, \
+                tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf:
+            docx_output = temp_docx.name
+            pdf_output = temp_pdf.name
+
+        editor(template_path, docx_output, context)
+        convert_to_pdf(docx_output, pdf_output, doc_type)
+
+        # Files from an earlier version of the form are no longer reachable
+        if previous and not previous.get("shared"):
+            for old_path in (previous["docx"], previous["pdf"]):
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+
+    st.session_state[state_key] = {"fingerprint": fingerprint, "docx": docx_output, "pdf": pdf_output,
+                                   "shared": BACKGROUND_CONVERSIONS}
+    return docx_output, pdf_output
+
+
+def wait_for_conversion_job(job):
+    """Result of a finished conversion job; otherwise shows its status and stops the run."""
+    if job["status"] == "done":
+        return job["result"]
+
+    if job["status"] == "failed":
+        st.error(f"❌ Document generation failed: {job['error']}")
+        if st.button("🔄 Try again", key=f"retry_{job['job_key']}"):
+            conversion_jobs.retry(job["job_key"])
+            st.rerun()
+        st.stop()
+
+    show_conversion_progress(job["job_key"])
+    st.stop()
+
+
+CONVERSION_POLL_SECONDS = 1
+
+
+def show_conversion_progress(job_key):
+    # Only this fragment reruns while waiting; the full page reruns once the job ends
+    @st.fragment(run_every=CONVERSION_POLL_SECONDS)
+    def conversion_progress():
+        job = conversion_jobs.get(job_key)
+        if job is None or job["status"] in ("done", "failed"):
+            st.rerun()
+        if job["status"] == "queued":
+            ahead = conversion_jobs.position(job_key)
+            st.info(f"⏳ Waiting for the document generator ({ahead} job(s) ahead)...")
+        else:
+            st.info(f"⚙️ Generating your documents... ({time.time() - job['started_at']:.0f}s)")
+
+    conversion_progress()
+
+
+def show_template_gallery(options, select_key, blob_index, columns=4):
+    """Grid of first-page thumbnails; picking one sets the template select box."""
+    image_kwargs = {"use_column_width": True} if LOAD_LOCALLY else {"use_container_width": True}
+    names = list(options)
+    for row_start in range(0, len(names), columns):
+        for col, name in zip(st.columns(columns), names[row_start:row_start + columns]):
+            with col:
+                thumbnail_path = (options[name].get(THUMBNAILS_FIELD) or {}).get(str(GALLERY_THUMBNAIL_WIDTH))
+                try:
+                    if not thumbnail_path:
+                        raise FileNotFoundError("no thumbnail stored")
+                    st.image(fetch_blob(bucket, thumbnail_path, blob_index.generation(thumbnail_path)), **image_kwargs)
+                except Exception as e:
+                    print(f"⚠️ No gallery thumbnail for {name}: {e}")
+                    st.caption("🖼️ No thumbnail")
+
+                label = f"✅ {name}" if st.session_state.get(select_key) == name else name
+                st.button(label, key=f"{select_key}_gallery_{name}", use_container_width=True,
+                          on_click=lambda n=name: st.session_state.__setitem__(select_key, n))
+
+
+def validate_template_context(session_key, context, implicit=()):
+    """Stop before rendering when the selected template expects fields the context lacks."""
+    placeholders = st.session_state.get(session_key)
+    if placeholders is None:
+        # Template uploaded before placeholder indexing; nothing to check against
+        return
+    missing = missing_placeholders(placeholders, context, implicit)
+    if missing:
+        st.error(f"The selected template uses placeholders that this form does not fill: {', '.join(missing)}. "
+                 "Please fix the template or choose another one.")
+        st.stop()
+
+
 from num2words import num2words
 
 def currency_to_words_in_inr(formatted_amount: str) -> str:
@@ -146,13 +304,16 @@ def currency_to_words_in_inr(formatted_amount: str) -> str:
 
 
 def fetch_and_organize_templates(firestore_db, base_temp_dir=None):
-    # Base temp dir
+    # Base dir; the default is reused between runs so unchanged templates are skipped
     if not base_temp_dir:
-        base_temp_dir = tempfile.mkdtemp()
+        base_temp_dir = TEMPLATE_MIRROR_DIR
 
     # Main collection reference
     collection_ref = firestore_db.collection("HVT_DOC_Gen")
 
+    # Collect the jobs first, then download them on a bounded pool
+    jobs = []
+
     # Iterate through each document type (e.g., Proposal, NDA, etc.)
     doc_types = collection_ref.stream()
     for doc in doc_types:
@@ -160,6 +321,13 @@ def fetch_and_organize_templates(firestore_db, base_temp_dir=None):
         templates_ref = collection_ref.document(doc_type).collection("templates")
         templates = templates_ref.stream()
 
+        # Storage generations from the cached listing; without one the download is a conditional GET
+        try:
+            blob_index = get_blob_index(doc_type)
+        except Exception as e:
+            print(f"⚠️ Could not list {doc_type} templates, downloading without generations: {e}")
+            blob_index = None
+
         for template in templates:
             data = template.to_dict()
             file_url = data["download_url"]
@@ -172,20 +340,11 @@ def fetch_and_organize_templates(firestore_db, base_temp_dir=None):
             else:
                 target_dir = os.path.join(base_temp_dir, doc_type.lower().replace(" ", "_"))
 
-            os.makedirs(target_dir, exist_ok=True)
-
             file_path = os.path.join(target_dir, file_name)
+            generation = blob_index.generation(data.get("storage_path")) if blob_index else None
+            jobs.append((file_url, file_path, generation))
 
-            try:
-                # Download the file
-                response = requests.get(file_url)
-                if response.status_code == 200:
-                    with open(file_path, 'wb') as f:
-                        f.write(response.content)
-                else:
-                    print(f"Failed to download {file_name} (HTTP {response.status_code})")
-            except Exception as e:
-                print(f"Error downloading {file_name}: {str(e)}")
+    TemplateDownloader(base_temp_dir).download_all(jobs)
 
     return base_temp_dir
 
@@ -340,14 +499,10 @@ def handle_internship_certificate():
 
         st.button("← Back", on_click=lambda: setattr(st.session_state, 'form_step', 1))
 
-        # Create temp directory
-        temp_dir = os.path.join(tempfile.gettempdir(), "as_offer")
-        os.makedirs(temp_dir, exist_ok=True)
-
         doc_type = "Internship Certificate"
-        template_ref = firestore_db.collection("HVT_DOC_Gen").document(doc_type)
-        # templates = template_ref.collection("templates").order_by("upload_timestamp", direction="DESCENDING").get()
-        templates = template_ref.collection("templates").order_by("order", direction="ASCENDING").get()
+        # Served from the process-wide catalog cache, no Firestore round trip on reruns
+        templates = get_templates(doc_type)
+        blob_index = get_blob_index(doc_type)
 
         available_templates = []
         for t in templates:
@@ -358,8 +513,7 @@ def handle_internship_certificate():
                         "file_type") == "application/vnd.openxmlformats-officedocument.wordprocessingml.document" and
                     t_data.get("storage_path")
             ):
-                blob = bucket.blob(t_data["storage_path"])
-                if blob.exists():
+                if t_data["storage_path"] in blob_index:
                     available_templates.append({"doc": t, "metadata": t_data})
                 else:
                     print(f"❌ Skipping missing file: {t_data['storage_path']}")
@@ -401,6 +555,8 @@ def handle_internship_certificate():
             </style>
         """, unsafe_allow_html=True)
 
+        show_template_gallery({name: tpl["metadata"] for name, tpl in certificate_options.items()}, "certificate_template_select", blob_index)
+
         col1, col2 = st.columns([5, 1])
 
         with col1:
@@ -415,13 +571,14 @@ def handle_internship_certificate():
             selected_metadata = selected_template["metadata"]
             selected_storage_path = selected_metadata["storage_path"]
 
-            # Download the selected template
-            template_path = os.path.join(temp_dir, "selected_template.docx")
-            blob = bucket.blob(selected_storage_path)
-            blob.download_to_filename(template_path)
+            # Resolve the selected template through the shared blob cache
+            template_path = fetch_blob(bucket, selected_storage_path, blob_index.generation(selected_storage_path))
 
             # Store for later use
             st.session_state.selected_certificate_template_path = template_path
+            st.session_state.selected_certificate_template_placeholders = selected_metadata.get(PLACEHOLDERS_FIELD)
+            st.session_state.selected_certificate_template_version = (
+                f"{selected_storage_path}#{blob_index.generation(selected_storage_path)}")
 
             # Enhanced metadata display
             with st.expander("📄 Template Details", expanded=True):
@@ -466,17 +623,15 @@ def handle_internship_certificate():
                     # st.json(display_metadata)
 
 
-            # Show PDF preview if available
+            # Full PDF preview only on demand, the gallery above covers browsing
             if selected_metadata.get('has_pdf_preview', False):
-                # if st.button("👁️ Show Preview"):
-                try:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                        pdf_blob = bucket.blob(selected_metadata['pdf_storage_path'])
-                        pdf_blob.download_to_filename(tmp_file.name)
-                        # pdf_view()
-                        pdf_view(tmp_file.name)
-                except Exception as e:
-                    st.error(f"Failed to load preview: {str(e)}")
+                if st.toggle("👁️ Show full preview", key="show_full_template_preview"):
+                    try:
+                        preview_storage_path = selected_metadata['pdf_storage_path']
+                        preview_path = fetch_blob(bucket, preview_storage_path, blob_index.generation(preview_storage_path))
+                        pdf_view(preview_path)
+                    except Exception as e:
+                        st.error(f"Failed to load preview: {str(e)}")
             else:
                 st.write(f"Preview file unavailable.")
 
@@ -500,18 +655,21 @@ def handle_internship_certificate():
             }
 
 
-            temp_dir = os.path.join(tempfile.gettempdir(), "as_offer")
-            os.makedirs(temp_dir, exist_ok=True)
-
             template_path = st.session_state.selected_certificate_template_path
             # blob.download_to_filename(template_path)
 
-            docx_output = os.path.join(temp_dir, "cert.docx")
-            pdf_output = os.path.join(temp_dir, "cert.pdf")
+            # internship_edit fills in the article ("a"/"an") itself
+            validate_template_context("selected_certificate_template_placeholders", context, implicit={"a"})
 
             from inter_edit import internship_edit
-            internship_edit(template_path, docx_output, context)
-            main_converter(docx_output, pdf_output)
+            docx_output, pdf_output = generate_step3_documents(
+                "certificate_generated_files",
+                st.session_state.selected_certificate_template_version,
+                context,
+                internship_edit,
+                template_path,
+                doc_type="Internship Certificate"
+            )
 
             # Preview section
             st.subheader("Preview Certificate")
@@ -676,17 +834,10 @@ def handle_internship_offer():
 
         st.button("← Back", on_click=lambda: setattr(st.session_state, 'internship_offer_form_step', 1))
 
-        # Create temp directory
-        import os
-        temp_dir = os.path.join(tempfile.gettempdir(), "as__inter_offer")
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_dir = os.path.join(tempfile.gettempdir(), "as__inter_offer")
-        os.makedirs(temp_dir, exist_ok=True)
-
         doc_type = "Internship Offer"
-        template_ref = firestore_db.collection("HVT_DOC_Gen").document(doc_type)
-        # templates = template_ref.collection("templates").order_by("upload_timestamp", direction="DESCENDING").get()
-        templates = template_ref.collection("templates").order_by("order", direction="ASCENDING").get()
+        # Served from the process-wide catalog cache, no Firestore round trip on reruns
+        templates = get_templates(doc_type)
+        blob_index = get_blob_index(doc_type)
 
         available_templates = []
         for t in templates:
@@ -697,8 +848,7 @@ def handle_internship_offer():
                         "file_type") == "application/vnd.openxmlformats-officedocument.wordprocessingml.document" and
                     t_data.get("storage_path")
             ):
-                blob = bucket.blob(t_data["storage_path"])
-                if blob.exists():
+                if t_data["storage_path"] in blob_index:
                     available_templates.append({"doc": t, "metadata": t_data})
                 else:
                     print(f"❌ Skipping missing file: {t_data['storage_path']}")
@@ -740,6 +890,8 @@ def handle_internship_offer():
             </style>
         """, unsafe_allow_html=True)
 
+        show_template_gallery({name: tpl["metadata"] for name, tpl in certificate_options.items()}, "certificate_template_select", blob_index)
+
         col1, col2 = st.columns([5, 1])
 
         with col1:
@@ -754,13 +906,14 @@ def handle_internship_offer():
             selected_metadata = selected_template["metadata"]
             selected_storage_path = selected_metadata["storage_path"]
 
-            # Download the selected template
-            template_path = os.path.join(temp_dir, "selected_template.docx")
-            blob = bucket.blob(selected_storage_path)
-            blob.download_to_filename(template_path)
+            # Resolve the selected template through the shared blob cache
+            template_path = fetch_blob(bucket, selected_storage_path, blob_index.generation(selected_storage_path))
 
             # Store for later use
             st.session_state.selected_offer_template_path = template_path
+            st.session_state.selected_offer_template_placeholders = selected_metadata.get(PLACEHOLDERS_FIELD)
+            st.session_state.selected_offer_template_version = (
+                f"{selected_storage_path}#{blob_index.generation(selected_storage_path)}")
 
             # Enhanced metadata display
             with st.expander("📄 Template Details", expanded=True):
@@ -792,17 +945,15 @@ def handle_internship_offer():
                     # }
                     # st.json(display_metadata)
 
-            # Show PDF preview if available
+            # Full PDF preview only on demand, the gallery above covers browsing
             if selected_metadata.get('has_pdf_preview', False):
-                # if st.button("👁️ Show Preview"):
-                try:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                        pdf_blob = bucket.blob(selected_metadata['pdf_storage_path'])
-                        pdf_blob.download_to_filename(tmp_file.name)
-                        # pdf_view()
-                        pdf_view(tmp_file.name)
-                except Exception as e:
-                    st.error(f"Failed to load preview: {str(e)}")
+                if st.toggle("👁️ Show full preview", key="show_full_template_preview"):
+                    try:
+                        preview_storage_path = selected_metadata['pdf_storage_path']
+                        preview_path = fetch_blob(bucket, preview_storage_path, blob_index.generation(preview_storage_path))
+                        pdf_view(preview_path)
+                    except Exception as e:
+                        st.error(f"Failed to load preview: {str(e)}")
             else:
                 st.write(f"Preview file unavailable.")
 
@@ -841,16 +992,18 @@ def handle_internship_offer():
                 st.error(f"Error fetching template: {str(e)}")
                 return
 
-            # Generate temporary files
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf, \
-                    tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_docx:
-
-                pdf_output = temp_pdf.name
-                docx_output = temp_docx.name
-
-                # Use the downloaded template
-                offer_edit(template_path, docx_output, replacements_docx)
-                main_converter(docx_output, pdf_output)
+            validate_template_context("selected_offer_template_placeholders", replacements_docx)
+
+            # Rendered and converted once per template version and form data;
+            # reruns (e.g. the upload buttons) reuse the same files
+            docx_output, pdf_output = generate_step3_documents(
+                "offer_generated_files",
+                st.session_state.selected_offer_template_version,
+                replacements_docx,
+                offer_edit,
+                template_path,
+                doc_type="Internship Offer"
+            )
 
             # Preview section
             st.subheader("Preview")
@@ -863,7 +1016,7 @@ def handle_internship_offer():
             st.write(f"**Amount in words:** {st.session_state.internship_offer_data['amount_in_words']}")
             st.write(f"**Duration:** {st.session_state.internship_offer_data['duration']} months")
 
-            # PDF preview (requires pdfplumber)
+            # PDF preview (rendered with PyMuPDF)
             pdf_view(pdf_output)
 
             # Download buttons
@@ -1007,17 +1160,10 @@ def handle_relieving_letter():
 
         st.button("← Back", on_click=lambda: setattr(st.session_state, 'relieving_letter_form_step', 1))
 
-        # Create temp directory
-        import os
-        temp_dir = os.path.join(tempfile.gettempdir(), "as_letter")
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_dir = os.path.join(tempfile.gettempdir(), "as_letter")
-        os.makedirs(temp_dir, exist_ok=True)
-
         doc_type = "Relieving Letter"
-        template_ref = firestore_db.collection("HVT_DOC_Gen").document(doc_type)
-        # templates = template_ref.collection("templates").order_by("upload_timestamp", direction="DESCENDING").get()
-        templates = template_ref.collection("templates").order_by("order", direction="ASCENDING").get()
+        # Served from the process-wide catalog cache, no Firestore round trip on reruns
+        templates = get_templates(doc_type)
+        blob_index = get_blob_index(doc_type)
 
         available_templates = []
         for t in templates:
@@ -1028,8 +1174,7 @@ def handle_relieving_letter():
                         "file_type") == "application/vnd.openxmlformats-officedocument.wordprocessingml.document" and
                     t_data.get("storage_path")
             ):
-                blob = bucket.blob(t_data["storage_path"])
-                if blob.exists():
+                if t_data["storage_path"] in blob_index:
                     available_templates.append({"doc": t, "metadata": t_data})
                 else:
                     print(f"❌ Skipping missing file: {t_data['storage_path']}")
@@ -1071,6 +1216,8 @@ def handle_relieving_letter():
             </style>
         """, unsafe_allow_html=True)
 
+        show_template_gallery({name: tpl["metadata"] for name, tpl in certificate_options.items()}, "certificate_template_select", blob_index)
+
         col1, col2 = st.columns([5, 1])
 
         with col1:
@@ -1085,13 +1232,14 @@ def handle_relieving_letter():
             selected_metadata = selected_template["metadata"]
             selected_storage_path = selected_metadata["storage_path"]
 
-            # Download the selected template
-            template_path = os.path.join(temp_dir, "selected_template.docx")
-            blob = bucket.blob(selected_storage_path)
-            blob.download_to_filename(template_path)
+            # Resolve the selected template through the shared blob cache
+            template_path = fetch_blob(bucket, selected_storage_path, blob_index.generation(selected_storage_path))
 
             # Store for later use
             st.session_state.selected_letter_template_path = template_path
+            st.session_state.selected_letter_template_placeholders = selected_metadata.get(PLACEHOLDERS_FIELD)
+            st.session_state.selected_letter_template_version = (
+                f"{selected_storage_path}#{blob_index.generation(selected_storage_path)}")
 
             # Enhanced metadata display
             with st.expander("📄 Template Details", expanded=True):
@@ -1123,17 +1271,15 @@ def handle_relieving_letter():
                     # }
                     # st.json(display_metadata)
 
-            # Show PDF preview if available
+            # Full PDF preview only on demand, the gallery above covers browsing
             if selected_metadata.get('has_pdf_preview', False):
-                # if st.button("👁️ Show Preview"):
-                try:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                        pdf_blob = bucket.blob(selected_metadata['pdf_storage_path'])
-                        pdf_blob.download_to_filename(tmp_file.name)
-                        # pdf_view()
-                        pdf_view(tmp_file.name)
-                except Exception as e:
-                    st.error(f"Failed to load preview: {str(e)}")
+                if st.toggle("👁️ Show full preview", key="show_full_template_preview"):
+                    try:
+                        preview_storage_path = selected_metadata['pdf_storage_path']
+                        preview_path = fetch_blob(bucket, preview_storage_path, blob_index.generation(preview_storage_path))
+                        pdf_view(preview_path)
+                    except Exception as e:
+                        st.error(f"Failed to load preview: {str(e)}")
             else:
                 st.write(f"Preview file unavailable.")
 
@@ -1203,17 +1349,20 @@ def handle_relieving_letter():
                 st.error(f"Error fetching template: {str(e)}")
                 return
 
-            # Generate temporary files
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf, \
-                    tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_docx:
+            validate_template_context("selected_letter_template_placeholders", replacements_docx)
 
-                pdf_output = temp_pdf.name
-                docx_output = temp_docx.name
-                from releive_editor import relieve_edit
+            # Rendered and converted once per template version and form data;
+            # reruns (e.g. the upload buttons) reuse the same files
+            from releive_editor import relieve_edit
 
-                # Use the downloaded template
-                relieve_edit(template_path, docx_output, replacements_docx)
-                main_converter(docx_output, pdf_output)
+            docx_output, pdf_output = generate_step3_documents(
+                "letter_generated_files",
+                st.session_state.selected_letter_template_version,
+                replacements_docx,
+                relieve_edit,
+                template_path,
+                doc_type="Relieving Letter"
+            )
 
             # Preview section
             st.subheader("Preview")
@@ -1224,7 +1373,7 @@ def handle_relieving_letter():
             st.write(f"**End Date:** {st.session_state.relieving_letter_data['end_date']}")
             st.write(f"**Duration:** {st.session_state.relieving_letter_data['duration']} months")
 
-            # PDF preview (requires pdfplumber)
+            # PDF preview (rendered with PyMuPDF)
             pdf_view(pdf_output)
 
             # Download buttons
@@ -1333,17 +1482,10 @@ def handle_contract():
 
         st.button("← Back", on_click=lambda: setattr(st.session_state, 'contract_form_step', 1))
 
-        # Create temp directory
-        import os
-        temp_dir = os.path.join(tempfile.gettempdir(), "as_contract")
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_dir = os.path.join(tempfile.gettempdir(), "as_contract")
-        os.makedirs(temp_dir, exist_ok=True)
-
         doc_type = "Project Contract"
-        template_ref = firestore_db.collection("HVT_DOC_Gen").document(doc_type)
-        # templates = template_ref.collection("templates").order_by("upload_timestamp", direction="DESCENDING").get()
-        templates = template_ref.collection("templates").order_by("order", direction="ASCENDING").get()
+        # Served from the process-wide catalog cache, no Firestore round trip on reruns
+        templates = get_templates(doc_type)
+        blob_index = get_blob_index(doc_type)
 
         available_templates = []
         for t in templates:
@@ -1354,8 +1496,7 @@ def handle_contract():
                         "file_type") == "application/vnd.openxmlformats-officedocument.wordprocessingml.document" and
                     t_data.get("storage_path")
             ):
-                blob = bucket.blob(t_data["storage_path"])
-                if blob.exists():
+                if t_data["storage_path"] in blob_index:
                     available_templates.append({"doc": t, "metadata": t_data})
                 else:
                     print(f"❌ Skipping missing file: {t_data['storage_path']}")
@@ -1397,6 +1538,8 @@ def handle_contract():
             </style>
         """, unsafe_allow_html=True)
 
+        show_template_gallery({name: tpl["metadata"] for name, tpl in certificate_options.items()}, "certificate_template_select", blob_index)
+
         col1, col2 = st.columns([5, 1])
 
         with col1:
@@ -1411,13 +1554,14 @@ def handle_contract():
             selected_metadata = selected_template["metadata"]
             selected_storage_path = selected_metadata["storage_path"]
 
-            # Download the selected template
-            template_path = os.path.join(temp_dir, "selected_template.docx")
-            blob = bucket.blob(selected_storage_path)
-            blob.download_to_filename(template_path)
+            # Resolve the selected template through the shared blob cache
+            template_path = fetch_blob(bucket, selected_storage_path, blob_index.generation(selected_storage_path))
 
             # Store for later use
             st.session_state.selected_contract_template_path = template_path
+            st.session_state.selected_contract_template_placeholders = selected_metadata.get(PLACEHOLDERS_FIELD)
+            st.session_state.selected_contract_template_version = (
+                f"{selected_storage_path}#{blob_index.generation(selected_storage_path)}")
 
             # Enhanced metadata display
             with st.expander("📄 Template Details", expanded=True):
@@ -1449,17 +1593,15 @@ def handle_contract():
                     # }
                     # st.json(display_metadata)
 
-            # Show PDF preview if available
+            # Full PDF preview only on demand, the gallery above covers browsing
             if selected_metadata.get('has_pdf_preview', False):
-                # if st.button("👁️ Show Preview"):
-                try:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                        pdf_blob = bucket.blob(selected_metadata['pdf_storage_path'])
-                        pdf_blob.download_to_filename(tmp_file.name)
-                        # pdf_view()
-                        pdf_view(tmp_file.name)
-                except Exception as e:
-                    st.error(f"Failed to load preview: {str(e)}")
+                if st.toggle("👁️ Show full preview", key="show_full_template_preview"):
+                    try:
+                        preview_storage_path = selected_metadata['pdf_storage_path']
+                        preview_path = fetch_blob(bucket, preview_storage_path, blob_index.generation(preview_storage_path))
+                        pdf_view(preview_path)
+                    except Exception as e:
+                        st.error(f"Failed to load preview: {str(e)}")
             else:
                 st.write(f"Preview file unavailable.")
 
@@ -1511,17 +1653,18 @@ def handle_contract():
                 st.error(f"Error fetching template: {str(e)}")
                 return
 
-            # Generate temporary files
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf, \
-                    tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_docx:
-
-                pdf_output = temp_pdf.name
-                docx_output = temp_docx.name
-
-                # Use the downloaded template
-                # offer_edit(template_path, docx_output, replacements_docx)
-                nda_edit(template_path, docx_output, replacements_docx)
-                main_converter(docx_output, pdf_output)
+            validate_template_context("selected_contract_template_placeholders", replacements_docx)
+
+            # Rendered and converted once per template version and form data;
+            # reruns (e.g. the upload buttons) reuse the same files
+            docx_output, pdf_output = generate_step3_documents(
+                "contract_generated_files",
+                st.session_state.selected_contract_template_version,
+                replacements_docx,
+                nda_edit,
+                template_path,
+                doc_type="Project Contract"
+            )
 
             # Preview section
             st.subheader("Preview")
@@ -1531,7 +1674,7 @@ def handle_contract():
             st.write(f"**Company Address:** {st.session_state.contract_data['client_company_address']}")
             st.write(f"**Contract End Date:** {st.session_state.contract_data['contract_end']}")
 
-            # PDF preview (requires pdfplumber)
+            # PDF preview (rendered with PyMuPDF)
             pdf_view(pdf_output)
 
             # Download buttons
@@ -1637,17 +1780,10 @@ def handle_nda():
 
         st.button("← Back", on_click=lambda: setattr(st.session_state, 'nda_form_step', 1))
 
-        # Create temp directory
-        import os
-        temp_dir = os.path.join(tempfile.gettempdir(), "as_nda")
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_dir = os.path.join(tempfile.gettempdir(), "as_nda")
-        os.makedirs(temp_dir, exist_ok=True)
-
         doc_type = "Project NDA"
-        template_ref = firestore_db.collection("HVT_DOC_Gen").document(doc_type)
-        # templates = template_ref.collection("templates").order_by("upload_timestamp", direction="DESCENDING").get()
-        templates = template_ref.collection("templates").order_by("order", direction="ASCENDING").get()
+        # Served from the process-wide catalog cache, no Firestore round trip on reruns
+        templates = get_templates(doc_type)
+        blob_index = get_blob_index(doc_type)
 
         available_templates = []
         for t in templates:
@@ -1658,8 +1794,7 @@ def handle_nda():
                         "file_type") == "application/vnd.openxmlformats-officedocument.wordprocessingml.document" and
                     t_data.get("storage_path")
             ):
-                blob = bucket.blob(t_data["storage_path"])
-                if blob.exists():
+                if t_data["storage_path"] in blob_index:
                     available_templates.append({"doc": t, "metadata": t_data})
                 else:
                     print(f"❌ Skipping missing file: {t_data['storage_path']}")
@@ -1701,6 +1836,8 @@ def handle_nda():
             </style>
         """, unsafe_allow_html=True)
 
+        show_template_gallery({name: tpl["metadata"] for name, tpl in certificate_options.items()}, "certificate_template_select", blob_index)
+
         col1, col2 = st.columns([5, 1])
 
         with col1:
@@ -1715,13 +1852,14 @@ def handle_nda():
             selected_metadata = selected_template["metadata"]
             selected_storage_path = selected_metadata["storage_path"]
 
-            # Download the selected template
-            template_path = os.path.join(temp_dir, "selected_template.docx")
-            blob = bucket.blob(selected_storage_path)
-            blob.download_to_filename(template_path)
+            # Resolve the selected template through the shared blob cache
+            template_path = fetch_blob(bucket, selected_storage_path, blob_index.generation(selected_storage_path))
 
             # Store for later use
             st.session_state.selected_nda_template_path = template_path
+            st.session_state.selected_nda_template_placeholders = selected_metadata.get(PLACEHOLDERS_FIELD)
+            st.session_state.selected_nda_template_version = (
+                f"{selected_storage_path}#{blob_index.generation(selected_storage_path)}")
 
             # Enhanced metadata display
             with st.expander("📄 Template Details", expanded=True):
@@ -1753,17 +1891,15 @@ def handle_nda():
                     # }
                     # st.json(display_metadata)
 
-            # Show PDF preview if available
+            # Full PDF preview only on demand, the gallery above covers browsing
             if selected_metadata.get('has_pdf_preview', False):
-                # if st.button("👁️ Show Preview"):
-                try:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                        pdf_blob = bucket.blob(selected_metadata['pdf_storage_path'])
-                        pdf_blob.download_to_filename(tmp_file.name)
-                        # pdf_view()
-                        pdf_view(tmp_file.name)
-                except Exception as e:
-                    st.error(f"Failed to load preview: {str(e)}")
+                if st.toggle("👁️ Show full preview", key="show_full_template_preview"):
+                    try:
+                        preview_storage_path = selected_metadata['pdf_storage_path']
+                        preview_path = fetch_blob(bucket, preview_storage_path, blob_index.generation(preview_storage_path))
+                        pdf_view(preview_path)
+                    except Exception as e:
+                        st.error(f"Failed to load preview: {str(e)}")
             else:
                 st.write(f"Preview file unavailable.")
 
@@ -1842,17 +1978,18 @@ def handle_nda():
                 st.error(f"Error fetching template: {str(e)}")
                 return
 
-            # Generate temporary files
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf, \
-                    tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_docx:
-
-                pdf_output = temp_pdf.name
-                docx_output = temp_docx.name
-
-                # Use the downloaded template
-                # offer_edit(template_path, docx_output, replacements_docx)
-                nda_edit(template_path, docx_output, replacements_docx)
-                main_converter(docx_output, pdf_output)
+            validate_template_context("selected_nda_template_placeholders", replacements_docx)
+
+            # Rendered and converted once per template version and form data;
+            # reruns (e.g. the upload buttons) reuse the same files
+            docx_output, pdf_output = generate_step3_documents(
+                "nda_generated_files",
+                st.session_state.selected_nda_template_version,
+                replacements_docx,
+                nda_edit,
+                template_path,
+                doc_type="Project NDA"
+            )
 
             # Preview section
             st.subheader("Preview")
@@ -1861,7 +1998,7 @@ def handle_nda():
             st.write(f"**Company Name:** {st.session_state.nda_data['client_company_name']}")
             st.write(f"**Company Address:** {st.session_state.nda_data['client_company_address']}")
 
-            # PDF preview (requires pdfplumber)
+            # PDF preview (rendered with PyMuPDF)
             pdf_view(pdf_output)
 
             # Download buttons
@@ -2002,17 +2139,10 @@ def handle_invoice():
 
         st.button("← Back", on_click=lambda: setattr(st.session_state, 'invoice_form_step', 1))
 
-        # Create temp directory
-        import os
-        temp_dir = os.path.join(tempfile.gettempdir(), "as_invoice")
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_dir = os.path.join(tempfile.gettempdir(), "as_invoice")
-        os.makedirs(temp_dir, exist_ok=True)
-
         doc_type = "Project Invoice"
-        template_ref = firestore_db.collection("HVT_DOC_Gen").document(doc_type)
-        # templates = template_ref.collection("templates").order_by("upload_timestamp", direction="DESCENDING").get()
-        templates = template_ref.collection("templates").order_by("order", direction="ASCENDING").get()
+        # Served from the process-wide catalog cache, no Firestore round trip on reruns
+        templates = get_templates(doc_type)
+        blob_index = get_blob_index(doc_type)
 
         available_templates = []
         for t in templates:
@@ -2023,8 +2153,7 @@ def handle_invoice():
                         "file_type") == "application/vnd.openxmlformats-officedocument.wordprocessingml.document" and
                     t_data.get("storage_path")
             ):
-                blob = bucket.blob(t_data["storage_path"])
-                if blob.exists():
+                if t_data["storage_path"] in blob_index:
                     available_templates.append({"doc": t, "metadata": t_data})
                 else:
                     print(f"❌ Skipping missing file: {t_data['storage_path']}")
@@ -2066,6 +2195,8 @@ def handle_invoice():
             </style>
         """, unsafe_allow_html=True)
 
+        show_template_gallery({name: tpl["metadata"] for name, tpl in certificate_options.items()}, "certificate_template_select", blob_index)
+
         col1, col2 = st.columns([5, 1])
 
         with col1:
@@ -2080,13 +2211,14 @@ def handle_invoice():
             selected_metadata = selected_template["metadata"]
             selected_storage_path = selected_metadata["storage_path"]
 
-            # Download the selected template
-            template_path = os.path.join(temp_dir, "selected_template.docx")
-            blob = bucket.blob(selected_storage_path)
-            blob.download_to_filename(template_path)
+            # Resolve the selected template through the shared blob cache
+            template_path = fetch_blob(bucket, selected_storage_path, blob_index.generation(selected_storage_path))
 
             # Store for later use
             st.session_state.selected_invoice_template_path = template_path
+            st.session_state.selected_invoice_template_placeholders = selected_metadata.get(PLACEHOLDERS_FIELD)
+            st.session_state.selected_invoice_template_version = (
+                f"{selected_storage_path}#{blob_index.generation(selected_storage_path)}")
 
             # Enhanced metadata display
             with st.expander("📄 Template Details", expanded=True):
@@ -2118,17 +2250,15 @@ def handle_invoice():
                     # }
                     # st.json(display_metadata)
 
-            # Show PDF preview if available
+            # Full PDF preview only on demand, the gallery above covers browsing
             if selected_metadata.get('has_pdf_preview', False):
-                # if st.button("👁️ Show Preview"):
-                try:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                        pdf_blob = bucket.blob(selected_metadata['pdf_storage_path'])
-                        pdf_blob.download_to_filename(tmp_file.name)
-                        # pdf_view()
-                        pdf_view(tmp_file.name)
-                except Exception as e:
-                    st.error(f"Failed to load preview: {str(e)}")
+                if st.toggle("👁️ Show full preview", key="show_full_template_preview"):
+                    try:
+                        preview_storage_path = selected_metadata['pdf_storage_path']
+                        preview_path = fetch_blob(bucket, preview_storage_path, blob_index.generation(preview_storage_path))
+                        pdf_view(preview_path)
+                    except Exception as e:
+                        st.error(f"Failed to load preview: {str(e)}")
             else:
                 st.write(f"Preview file unavailable.")
 
@@ -2203,17 +2333,18 @@ def handle_invoice():
                 st.error(f"Error fetching template: {str(e)}")
                 return
 
-            # Generate temporary files
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf, \
-                    tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_docx:
-
-                pdf_output = temp_pdf.name
-                docx_output = temp_docx.name
-
-                # Use the downloaded template
-                # offer_edit(template_path, docx_output, replacements_docx)
-                nda_edit(template_path, docx_output, replacements_docx)
-                main_converter(docx_output, pdf_output)
+            validate_template_context("selected_invoice_template_placeholders", replacements_docx)
+
+            # Rendered and converted once per template version and form data;
+            # reruns (e.g. the upload buttons) reuse the same files
+            docx_output, pdf_output = generate_step3_documents(
+                "invoice_generated_files",
+                st.session_state.selected_invoice_template_version,
+                replacements_docx,
+                nda_edit,
+                template_path,
+                doc_type="Project Invoice"
+            )
 
             # Preview section
             st.subheader("Preview")
@@ -2226,7 +2357,7 @@ def handle_invoice():
             st.write(f"**Company Address:** {st.session_state.invoice_data['client_address']}")
             st.write(f"**Project Name:** {st.session_state.invoice_data['project_name']}")
 
-            # PDF preview (requires pdfplumber)
+            # PDF preview (rendered with PyMuPDF)
             pdf_view(pdf_output)
 
             # Download buttons
@@ -2608,7 +2739,7 @@ def handle_invoice_old():
 
                 # Use the downloaded template
                 invoice_edit(template_path, docx_output, context)
-                main_converter(docx_output, pdf_output)
+                convert_to_pdf(docx_output, pdf_output, "Project Invoice")
 
             # Preview section
             st.subheader("Invoice Preview")
@@ -2711,74 +2842,26 @@ def handle_invoice_old():
 
 
 def fetch_proposal_templates_to_temp_dir(firestore_db, bucket):
-    base_temp_dir = tempfile.mkdtemp(prefix="proposal_templates_")
-
-    # Mapping section labels to their Firestore subcollection names
-    section_map = {
-        "cover_page": "Cover Page",
-        "table_of_contents": "Table of Contents",
-        "business_requirement": "Business Requirement",
-        "page_3_6": "Page 3 to 6",
-        "testimonials": "Testimonials"
-    }
-
-    folder_paths = {}
-
-    for section_key, section_label in section_map.items():
-        target_dir = os.path.join(base_temp_dir, section_key)
-        os.makedirs(target_dir, exist_ok=True)
-        folder_paths[section_key] = target_dir
-
-        try:
-            templates_ref = firestore_db.collection("HVT_DOC_Gen").document("Proposal").collection(section_key)
-            templates = templates_ref.stream()
-
-            for doc in templates:
-                data = doc.to_dict()
-
-                if not data.get("storage_path"):
-                    continue
-
-                filename = data.get("original_name", doc.id)
-                if not filename.lower().endswith(".pdf"):
-                    filename += ".pdf"
-
-                target_path = os.path.join(target_dir, filename)
-
-                try:
-                    blob = bucket.blob(data["storage_path"])
-                    blob.download_to_filename(target_path)
-                except Exception as e:
-                    print(f"❌ Failed to download {data['storage_path']}: {e}")
-
-        except Exception as e:
-            print(f"⚠️ Failed to fetch templates from section {section_key}: {e}")
-
-    return folder_paths
+    # Incremental sync of the long-lived proposal mirror; a no-op while the catalog is unchanged
+    global _proposal_mirror
+    if _proposal_mirror is None:
+        _proposal_mirror = ProposalTemplateMirror(PROPOSAL_MIRROR_DIR, bucket)
+    return _proposal_mirror.sync()
 
 
 def fetch_path_from_temp_dir(sub_folder, selected_template, folder_paths):
     try:
         # Ensure required input
-        if not selected_template or "original_name" not in selected_template:
+        if not selected_template or "storage_path" not in selected_template:
             st.error("Invalid template data provided.")
             return None
 
-        the_temp_dir = folder_paths.get(sub_folder)
-        if not the_temp_dir:
-            st.error(f"❌ Templates folder for '{sub_folder}' not found in folder_paths.")
-            return None
-
-        # Construct expected file name
-        expected_filename = selected_template["original_name"]
-        if not expected_filename.lower().endswith(".pdf"):
-            expected_filename += ".pdf"
-
-        template_path = os.path.join(the_temp_dir, expected_filename)
+        # Resolve against the mirror manifest (storage path -> local path)
+        template_path = folder_paths.local_path(selected_template["storage_path"])
 
         # Check if file exists
-        if not os.path.isfile(template_path):
-            st.error(f"❌ Template file not found: `{template_path}`")
+        if not template_path:
+            st.error(f"❌ Template file not found in '{sub_folder}': `{selected_template['storage_path']}`")
             return None
 
         return template_path
@@ -2789,23 +2872,20 @@ def fetch_path_from_temp_dir(sub_folder, selected_template, folder_paths):
 
 
 def get_proposal_template_details(firestore_db):
-    doc_type = "Proposal"
-    proposal_doc_ref = firestore_db.collection("HVT_DOC_Gen").document(doc_type)
-
-    # Subcollections map
-    section_keys = [
-        "cover_page",
-        "table_of_contents",
-        "business_requirement",
-        "page_3_6",
-        "testimonials"
-    ]
+    global _proposal_template_index, _proposal_template_sources
 
-    all_templates = []
+    # Subcollections come from the catalog cache; a cold load fetches them concurrently
+    sections = list(_proposal_catalog_pool.map(lambda key: (key, get_templates("Proposal", key)), PROPOSAL_SECTIONS))
+
+    # Rebuild the index only when one of the cached catalog entries changed
+    sources = tuple(docs for _, docs in sections)
+    if _proposal_template_index is not None and all(
+            a is b for a, b in zip(sources, _proposal_template_sources)):
+        return _proposal_template_index
 
-    for section_key in section_keys:
-        templates = proposal_doc_ref.collection(section_key).stream()
+    all_templates = []
 
+    for section_key, templates in sections:
         for doc in templates:
             data = doc.to_dict()
             if not data:
@@ -2830,28 +2910,25 @@ def get_proposal_template_details(firestore_db):
                 "proposal_section_type": data.get("proposal_section_type"),
                 "pdf_name": data.get("pdf_name"),
                 "num_pages": data.get("num_pages"),
+                "thumbnails": data.get("thumbnails"),
                 "section_key": section_key,
                 "document_id": doc.id  # Include Firestore document ID for edit/delete
             }
 
             all_templates.append(file_details)
 
-    return all_templates
+    _proposal_template_index = ProposalTemplateIndex(all_templates)
+    _proposal_template_sources = sources
+    return _proposal_template_index
 
 
 def get_specific_templates(all_templates, number_of_pages):
-    # Filter for table_of_contents and testimonials with exactly 8 pages
-    filtered_templates = [
-        tpl for tpl in all_templates
-        if tpl["section_key"] in ["table_of_contents", "testimonials"]
-           and tpl.get("num_pages") == number_of_pages
-    ]
-
-    # Group by section and get first match from each
+    # First table_of_contents and testimonials template with the given page count
     result = {}
-    for tpl in filtered_templates:
-        if tpl["section_key"] not in result:  # Only take first match per section
-            result[tpl["section_key"]] = tpl
+    for section_key in ["table_of_contents", "testimonials"]:
+        matches = all_templates.with_pages(section_key, number_of_pages)
+        if matches:
+            result[section_key] = matches[0]
 
     return result
 
@@ -4387,7 +4464,7 @@ def handle_proposal():
         st.subheader("Select Cover Page")
         st.button("← Back to Form", on_click=lambda: setattr(st.session_state, 'proposal_form_step', 1))
 
-        cover_templates = [tpl for tpl in all_templates if tpl["proposal_section_type"] == "cover_page"]
+        cover_templates = all_templates.section("cover_page")
         cover_options = {
             tpl["pdf_name"] or tpl["original_name"]: tpl for tpl in cover_templates
         }
@@ -4396,6 +4473,8 @@ def handle_proposal():
             st.error("No valid cover templates available. Cannot proceed.")
             st.stop()
 
+        show_template_gallery(cover_options, "cover_template_select", get_blob_index("Proposal"))
+
         col1, col2 = st.columns([5, 1])
         with col1:
             selected_cover_name = st.selectbox(
@@ -4444,7 +4523,8 @@ def handle_proposal():
             )
 
             if os.path.exists(temp_img_path):
-                pdf_view(temp_img_path)
+                if st.toggle("👁️ Show full preview", key="show_full_proposal_preview"):
+                    pdf_view(temp_img_path)
             else:
                 st.warning("Preview not available")
 
@@ -4479,7 +4559,7 @@ def handle_proposal():
         # st.session_state.proposal_data["cover_template_name"]
         show_template("cover_template_name", "cover_template_json", "Cover Template")
 
-        br_templates = [tpl for tpl in all_templates if tpl["proposal_section_type"] == "business_requirement"]
+        br_templates = all_templates.section("business_requirement")
         br_options = {
             tpl["pdf_name"] or tpl["original_name"]: tpl for tpl in br_templates
         }
@@ -4488,6 +4568,8 @@ def handle_proposal():
             st.error("No valid business requirements templates available.")
             st.stop()
 
+        show_template_gallery(br_options, "br_template_select", get_blob_index("Proposal"))
+
         col1, col2 = st.columns([5, 1])
         with col1:
             selected_br_name = st.selectbox(
@@ -4542,7 +4624,8 @@ def handle_proposal():
             editor.modify_pdf_fields(temp_br_path, modifications)
 
             if os.path.exists(temp_br_path):
-                pdf_view(temp_br_path)
+                if st.toggle("👁️ Show full preview", key="show_full_proposal_preview"):
+                    pdf_view(temp_br_path)
             else:
                 st.warning("Preview not available")
 
@@ -4576,7 +4659,7 @@ def handle_proposal():
 
 
 
-        toc_templates = [tpl for tpl in all_templates if tpl["proposal_section_type"] == "table_of_contents"]
+        toc_templates = all_templates.section("table_of_contents")
         toc_options = {
             tpl["pdf_name"] or tpl["original_name"]: tpl for tpl in toc_templates
         }
@@ -4585,6 +4668,8 @@ def handle_proposal():
             st.error("No valid table of contents templates available.")
             st.stop()
 
+        show_template_gallery(toc_options, "toc_template_select", get_blob_index("Proposal"))
+
         col1, col2 = st.columns([5, 1])
         with col1:
             selected_toc_name = st.selectbox(
@@ -4621,7 +4706,8 @@ def handle_proposal():
             # (Add your modification logic here if needed)
 
             if os.path.exists(template_path):
-                pdf_view(template_path)
+                if st.toggle("👁️ Show full preview", key="show_full_proposal_preview"):
+                    pdf_view(template_path)
             else:
                 st.warning("Preview not available")
 
@@ -4654,7 +4740,7 @@ def handle_proposal():
         show_template("br_template_name", "br_template_json", "BR Template")
         show_template("table_of_contents_name", "table_of_contents_json", "Table of ContentTemplate")
 
-        testimonial_templates = [tpl for tpl in all_templates if tpl["proposal_section_type"] == "testimonials"]
+        testimonial_templates = all_templates.section("testimonials")
         testimonial_options = {
             tpl["pdf_name"] or tpl["original_name"]: tpl for tpl in testimonial_templates
         }
@@ -4663,6 +4749,8 @@ def handle_proposal():
             st.error("No valid testimonial templates available.")
             st.stop()
 
+        show_template_gallery(testimonial_options, "testimonial_template_select", get_blob_index("Proposal"))
+
         col1, col2 = st.columns([5, 1])
         with col1:
             selected_testimonial_name = st.selectbox(
@@ -4699,7 +4787,8 @@ def handle_proposal():
             # (Add your modification logic here if needed)
 
             if os.path.exists(template_path):
-                pdf_view(template_path)
+                if st.toggle("👁️ Show full preview", key="show_full_proposal_preview"):
+                    pdf_view(template_path)
             else:
                 st.warning("Preview not available")
 
@@ -4738,7 +4827,7 @@ def handle_proposal():
         # st.markdown(f"**Table of Content Template:** {st.session_state.proposal_data['table_of_contents_name']}")
         # st.markdown(f"**Testimonial Template:** {st.session_state.proposal_data['testimonials_name']}")
 
-        p3_p6_templates = [tpl for tpl in all_templates if tpl["proposal_section_type"] == "page_3_6"]
+        p3_p6_templates = all_templates.section("page_3_6")
         p3_p6_options = {
             tpl["pdf_name"] or tpl["original_name"]: tpl for tpl in p3_p6_templates
         }
@@ -4747,6 +4836,8 @@ def handle_proposal():
             st.error("No valid page 3-6 templates available.")
             st.stop()
 
+        show_template_gallery(p3_p6_options, "p3_p6_template_select", get_blob_index("Proposal"))
+
         col1, col2 = st.columns([5, 1])
         with col1:
             selected_p3_p6_name = st.selectbox(
@@ -4783,7 +4874,8 @@ def handle_proposal():
             # (Add your modification logic here if needed)
 
             if os.path.exists(template_path):
-                pdf_view(template_path)
+                if st.toggle("👁️ Show full preview", key="show_full_proposal_preview"):
+                    pdf_view(template_path)
             else:
                 st.warning("Preview not available")
 
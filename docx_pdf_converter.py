@@ -2,154 +2,427 @@ import streamlit as st
 import requests
 import os
 import sys
+import base64
+import hashlib
+import mmap
+import tempfile
 import time
+import random
+import threading
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from adobe_token import AdobeTokenProvider
+from http_session import get_session, header_md5, DEFAULT_TIMEOUT
+from asset_cleanup import AssetCleanupQueue
+from upload_uri_pool import UploadUriPool
+from conversion_errors import ConversionTimeoutError, CircuitOpenError
+from api_guard import api_limiter, api_breaker, LIMITER_MAX_WAIT_SECONDS
+from deadlines import Deadline, LatencyTracker, hedged_call
+from libreoffice_converter import soffice_pool
+from load_config import PDF_CONVERTER_BACKENDS
+from conversion_cache import conversion_cache, docx_fingerprint
 
 UNINITIALIZED_VALUE = 'UNINITIALIZED'
 
 # Configuration
+# ADOBE_* environment variables take precedence over secrets, e.g. to point the
+# pipeline at mock_pdf_services.py for load tests
 CONFIG = {
-    'BASE_URL': st.secrets["adobe"]["BASE_URL"],
-    'CLIENT_ID': st.secrets["adobe"]["CLIENT_ID"],
-    'CLIENT_SECRET': st.secrets["adobe"]["CLIENT_SECRET"],
+    'BASE_URL': os.environ.get('ADOBE_BASE_URL') or st.secrets["adobe"]["BASE_URL"],
+    'CLIENT_ID': os.environ.get('ADOBE_CLIENT_ID') or st.secrets["adobe"]["CLIENT_ID"],
+    'CLIENT_SECRET': os.environ.get('ADOBE_CLIENT_SECRET') or st.secrets["adobe"]["CLIENT_SECRET"],
 }
 
-
-def make_request_with_retry(request_func, max_retries=3, initial_delay=1):
-    """Helper function to retry requests on connection errors"""
-    for attempt in range(max_retries):
-        try:
-            return request_func()
-        except (requests.exceptions.ConnectionError,
-                requests.exceptions.Timeout,
-                requests.exceptions.RequestException) as e:
-            if attempt == max_retries - 1:
-                raise
-            delay = initial_delay * (2 ** attempt)
-            time.sleep(delay)
-    raise Exception("Max retries exceeded unexpectedly")
+# All calls go through one pooled keep-alive session; retries, backoff and
+# timeouts are configured on it (see http_session.py)
+
+CONVERSION_TIMEOUT_SECONDS = 120  # end-to-end deadline for one conversion
+POLL_INITIAL_DELAY = 0.1
+POLL_BACKOFF = 1.6
+POLL_MAX_DELAY = 3.0
+
+# Observed latencies of the hedged GETs (status polls, PDF downloads), see deadlines.py
+status_poll_latency = LatencyTracker("status_poll")
+pdf_download_latency = LatencyTracker("pdf_download")
+
+# Recent (duration, status polls) of finished createpdf jobs
+job_durations = deque(maxlen=500)
+_job_durations_lock = threading.Lock()
+
+
+# Priority of the conversion running in the current context, for the API rate limiter
+conversion_priority = contextvars.ContextVar("conversion_priority", default="interactive")
+
+
+def _api_request(method, url, deadline=None, **kwargs):
+    """PDF Services API call through the shared rate limiter and circuit breaker (see api_guard.py).
+
+    With a deadline, the limiter wait and the request timeouts come out of its remaining budget.
+    """
+    api_breaker.before_call()
+    budget_capped = False
+    try:
+        if deadline is not None:
+            api_limiter.acquire(conversion_priority.get(), min(deadline.remaining(), LIMITER_MAX_WAIT_SECONDS))
+            kwargs['timeout'] = deadline.timeout(f"{method} {url}", *DEFAULT_TIMEOUT)
+            budget_capped = kwargs['timeout'] != DEFAULT_TIMEOUT
+        else:
+            api_limiter.acquire(conversion_priority.get())
+    except ConversionTimeoutError:
+        api_breaker.cancel_probe()
+        raise
+    try:
+        response = get_session().request(method, url, **kwargs)
+    except requests.exceptions.Timeout as e:
+        if budget_capped:
+            # Our own deadline cut the wait short; that says nothing about the API's health
+            api_breaker.cancel_probe()
+            raise ConversionTimeoutError(f"Deadline exceeded during {method} {url}") from e
+        api_breaker.record(None)
+        raise
+    except BaseException:
+        api_breaker.record(None)
+        raise
+    api_breaker.record(response.status_code)
+    return response
+
+
+def request_access_token(client_id, client_secret, base_url):
+    response = _api_request(
+        'POST',
+        base_url + '/token',
+        headers={'Content-Type': 'application/x-www-form-urlencoded'},
+        data={
+            'client_id': client_id,
+            'client_secret': client_secret
+        }
+    )
+    response.raise_for_status()
+    data = response.json()
+    return data['access_token'], int(data.get('expires_in', 3600))
+
+
+# Shared by every conversion in the process, see adobe_token.py
+token_provider = AdobeTokenProvider(
+    lambda: request_access_token(CONFIG['CLIENT_ID'], CONFIG['CLIENT_SECRET'], CONFIG['BASE_URL'])
+)
 
 
 def get_access_token(client_id, client_secret, base_url):
-    def request():
-        response = requests.post(
-            url=base_url + '/token',
-            headers={'Content-Type': 'application/x-www-form-urlencoded'},
-            data={
-                'client_id': client_id,
-                'client_secret': client_secret
-            }
-        )
-        response.raise_for_status()
-        return response.json()['access_token']
-
-    return make_request_with_retry(request)
-
-
-def get_upload_uri(access_token, client_id, base_url):
-    def request():
-        response = requests.post(
-            base_url + '/assets',
-            headers={
-                'Authorization': f'Bearer {access_token}',
-                'x-api-key': client_id,
-                'Content-Type': 'application/json',
-            },
-            json={
-                'mediaType': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            }
-        )
-        response.raise_for_status()
-        data = response.json()
-        return data['uploadUri'], data['assetID']
-
-    return make_request_with_retry(request)
-
-
-def upload_docx(upload_url, docx_filename):
-    def request():
-        with open(docx_filename, 'rb') as f:
-            file_size = os.path.getsize(docx_filename)
-            response = requests.put(
-                upload_url,
-                headers={
-                    'Content-Type': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                    'Content-Length': str(file_size)
-                },
-                data=f
-            )
-        response.raise_for_status()
-
-    make_request_with_retry(request)
-
-
-def create_pdf(access_token, client_id, asset_id, base_url):
-    def request():
-        response = requests.post(
-            base_url + '/operation/createpdf',
-            headers={
-                'Authorization': f'Bearer {access_token}',
-                'x-api-key': client_id,
-                'Content-Type': 'application/json'
-            },
-            json={
-                'assetID': asset_id
-            }
-        )
-        response.raise_for_status()
-        return response.headers['Location']
-
-    return make_request_with_retry(request)
-
-
-def retrieve_pdf(access_token, client_id, location):
-    while True:
-        def request():
-            response = requests.get(
+    return token_provider.get_token()
+
+
+def get_upload_uri(access_token, client_id, base_url, deadline=None):
+    response = _api_request(
+        'POST',
+        base_url + '/assets',
+        deadline,
+        headers={
+            'Authorization': f'Bearer {access_token}',
+            'x-api-key': client_id,
+            'Content-Type': 'application/json',
+        },
+        json={
+            'mediaType': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+        }
+    )
+    response.raise_for_status()
+    data = response.json()
+    return data['uploadUri'], data['assetID']
+
+
+def upload_docx(upload_url, docx_filename, deadline=None):
+    # Read into memory so a retried PUT resends the whole body
+    with open(docx_filename, 'rb') as f:
+        body = f.read()
+    response = get_session().put(
+        upload_url,
+        headers={
+            'Content-Type': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            'Content-Length': str(len(body))
+        },
+        data=body,
+        timeout=deadline.timeout("upload", *DEFAULT_TIMEOUT) if deadline else DEFAULT_TIMEOUT
+    )
+    response.raise_for_status()
+
+
+def create_pdf(access_token, client_id, asset_id, base_url, deadline=None):
+    response = _api_request(
+        'POST',
+        base_url + '/operation/createpdf',
+        deadline,
+        headers={
+            'Authorization': f'Bearer {access_token}',
+            'x-api-key': client_id,
+            'Content-Type': 'application/json'
+        },
+        json={
+            'assetID': asset_id
+        }
+    )
+    response.raise_for_status()
+    return response.headers['Location']
+
+
+def _retry_after_seconds(response):
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        try:
+            return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+
+def record_job_duration(seconds, polls):
+    with _job_durations_lock:
+        job_durations.append((seconds, polls))
+
+
+def polling_stats():
+    """Summary of recently observed createpdf job durations, to tune the poll schedule."""
+    with _job_durations_lock:
+        samples = list(job_durations)
+    if not samples:
+        return {"jobs": 0}
+    durations = sorted(seconds for seconds, _ in samples)
+    return {
+        "jobs": len(samples),
+        "p50_seconds": durations[len(durations) // 2],
+        "p95_seconds": durations[min(int(len(durations) * 0.95), len(durations) - 1)],
+        "max_seconds": durations[-1],
+        "mean_polls": sum(polls for _, polls in samples) / len(samples),
+    }
+
+
+class _JobPoller:
+    """Poll schedule for one createpdf job (see retrieve_pdf_async)."""
+
+    def __init__(self, deadline=None):
+        self.started = time.monotonic()
+        self.deadline = deadline if deadline is not None else Deadline(CONVERSION_TIMEOUT_SECONDS)
+        self.delay = POLL_INITIAL_DELAY
+        self.polls = 0
+
+    def check(self, access_token, client_id, location):
+        """One status request: (download URI, None) when done, else (None, seconds to wait)."""
+        # Idempotent GET: hedged when slower than the usual status response
+        response = hedged_call(
+            lambda: _api_request(
+                'GET',
                 location,
+                self.deadline,
                 headers={
                     'Authorization': f'Bearer {access_token}',
                     'x-api-key': client_id,
                 }
-            )
-            response.raise_for_status()
-            return response.json()
-
-        data = make_request_with_retry(request)
+            ),
+            status_poll_latency,
+            self.deadline
+        )
+        response.raise_for_status()
+        data = response.json()
+        self.polls += 1
 
         if data['status'] == 'done':
-            return data['asset']['downloadUri']
+            record_job_duration(time.monotonic() - self.started, self.polls)
+            return data['asset']['downloadUri'], None
         elif data['status'] != 'in progress':
             raise Exception(f'Unknown status: {data["status"]}')
-        time.sleep(1)  # Wait before polling again
 
-
-def download_pdf(download_uri, pdf_filename):
-    def request():
-        response = requests.get(download_uri)
-        response.raise_for_status()
-        with open(pdf_filename, 'wb') as f:
-            f.write(response.content)
-
-    make_request_with_retry(request)
+        # Server hint first, otherwise exponential backoff with jitter
+        wait = _retry_after_seconds(response)
+        if wait is None:
+            wait = random.uniform(self.delay / 2, self.delay)
+            self.delay = min(self.delay * POLL_BACKOFF, POLL_MAX_DELAY)
+
+        remaining = self.deadline.remaining()
+        if remaining <= 0:
+            raise ConversionTimeoutError(
+                f"PDF conversion did not finish within {time.monotonic() - self.started:.0f}s "
+                f"({self.polls} status checks)")
+        return None, min(wait, remaining)
+
+
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+DOWNLOAD_MAX_RESUMES = 3
+
+
+def download_pdf(download_uri, pdf_filename, deadline=None):
+    """Stream the converted PDF to pdf_filename, resuming with Range requests if interrupted.
+
+    The file only appears (atomically) once its length and, when available, MD5 match.
+    The first request is hedged; the whole transfer must finish within the deadline.
+    """
+    deadline = deadline or Deadline(CONVERSION_TIMEOUT_SECONDS)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(pdf_filename)), suffix='.part')
+    md5 = hashlib.md5()
+    received = 0
+    expected_length = expected_md5 = None
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for attempt in range(DOWNLOAD_MAX_RESUMES + 1):
+                headers = {'Range': f'bytes={received}-'} if received else {}
+                try:
+                    def send(headers=headers):
+                        return get_session().get(download_uri, headers=headers, stream=True,
+                                                 timeout=deadline.timeout("download", *DEFAULT_TIMEOUT))
+
+                    # Hedge only the fresh request; a resume continues on a single connection
+                    response = send() if received else hedged_call(send, pdf_download_latency, deadline)
+                    with response:
+                        response.raise_for_status()
+                        if received and response.status_code != 206:
+                            # Range not honoured: start over
+                            f.seek(0)
+                            f.truncate()
+                            md5 = hashlib.md5()
+                            received = 0
+                        if not received:
+                            length = response.headers.get('Content-Length')
+                            # iter_content decodes gzip, so the header only counts identity bodies
+                            if length and not response.headers.get('Content-Encoding'):
+                                expected_length = int(length)
+                            expected_md5 = header_md5(response.headers)
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+                            md5.update(chunk)
+                            received += len(chunk)
+                            deadline.check("the end of the PDF download")
+                except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError) as e:
+                    if attempt == DOWNLOAD_MAX_RESUMES:
+                        raise
+                    print(f"⚠️ PDF download interrupted after {received} bytes, resuming: {e}")
+                    continue
+                if expected_length is None or received >= expected_length:
+                    break
+                print(f"⚠️ PDF download ended early ({received}/{expected_length} bytes), resuming")
+            else:
+                raise IOError(f"PDF download incomplete after {DOWNLOAD_MAX_RESUMES} resumes")
+
+        if expected_length is not None and received != expected_length:
+            raise IOError(f"PDF download size mismatch: got {received} bytes, expected {expected_length}")
+        if expected_md5 and base64.b64encode(md5.digest()).decode('ascii') != expected_md5:
+            raise IOError("PDF download MD5 mismatch")
+        # mkstemp creates the file owner-only (0600); publish it like any other output file
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, pdf_filename)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return pdf_filename
+
+
+def open_pdf(pdf_filename):
+    """Read-only memory map of a PDF: file-like (read/seek) and usable as a memoryview.
+
+    Lets the upload and the download link use the converted file without copying it
+    into Python bytes first. Use as a context manager to release the mapping.
+    Raises IOError for an empty file, which cannot be mapped.
+    """
+    with open(pdf_filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise IOError(f"{os.path.basename(pdf_filename)} is empty")
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
 
 def delete_asset(access_token, client_id, asset_id, base_url):
-    def request():
-        response = requests.delete(
-            base_url + f'/assets/{asset_id}',
-            headers={
-                'Authorization': f'Bearer {access_token}',
-                'x-api-key': client_id,
-            }
-        )
-        response.raise_for_status()
-
-    make_request_with_retry(request)
+    response = _api_request(
+        'DELETE',
+        base_url + f'/assets/{asset_id}',
+        headers={
+            'Authorization': f'Bearer {access_token}',
+            'x-api-key': client_id,
+        }
+    )
+    response.raise_for_status()
+
+
+def _delete_queued_asset(asset_id):
+    # Runs on the cleanup thread: yield API capacity to conversions
+    conversion_priority.set("background")
+    access_token = get_access_token(CONFIG['CLIENT_ID'], CONFIG['CLIENT_SECRET'], CONFIG['BASE_URL'])
+    try:
+        delete_asset(access_token, CONFIG['CLIENT_ID'], asset_id, CONFIG['BASE_URL'])
+    except requests.exceptions.HTTPError as e:
+        status = e.response.status_code if e.response is not None else None
+        if status == 404:
+            return  # already gone (expired or deleted by another instance)
+        if status == 401:
+            token_provider.invalidate(access_token)
+        raise
+
+
+# Uploaded assets are deleted in the background once their PDF is downloaded, see asset_cleanup.py
+asset_cleanup = AssetCleanupQueue(_delete_queued_asset)
+
+
+def _preallocate_upload_uri():
+    # Runs on the pool thread: prefetching should not delay conversions
+    conversion_priority.set("background")
+    access_token = get_access_token(CONFIG['CLIENT_ID'], CONFIG['CLIENT_SECRET'], CONFIG['BASE_URL'])
+    try:
+        return get_upload_uri(access_token, CONFIG['CLIENT_ID'], CONFIG['BASE_URL'])
+    except requests.exceptions.HTTPError as e:
+        if e.response is not None and e.response.status_code == 401:
+            token_provider.invalidate(access_token)
+        raise
+
+
+# Assets requested ahead of time so a conversion can upload at once, see upload_uri_pool.py
+upload_uri_pool = UploadUriPool(_preallocate_upload_uri, asset_cleanup.enqueue)
+
+
+# Async pipeline. Conversions run as coroutines on one background event loop; each
+# blocking HTTP step runs on the loop's thread pool (over the pooled session) and the
+# waits between status polls are asyncio sleeps, so a waiting job holds no thread.
+
+MAX_CONCURRENT_CONVERSIONS = 8
+CONVERSION_IO_THREADS = 32
+
+_loop = None
+_loop_lock = threading.Lock()
+_conversion_slots = None
+
+
+def _get_loop():
+    """Start (once per process) the event loop thread that runs conversions."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=CONVERSION_IO_THREADS,
+                                                         thread_name_prefix="pdf-io"))
+            threading.Thread(target=loop.run_forever, name="pdf-conversions", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+async def _run_blocking(func, *args):
+    # Run in the caller's context so conversion_priority reaches the pool thread
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(None, context.run, func, *args)
+
+
+async def retrieve_pdf_async(access_token, client_id, location, deadline=None):
+    poller = _JobPoller(deadline)
+    while True:
+        download_uri, wait = await _run_blocking(poller.check, access_token, client_id, location)
+        if download_uri:
+            return download_uri
+        await asyncio.sleep(wait)
 
 
-def main_converter(docx_filename, output_filename):
-    if output_filename == "":
-        output_filename = os.path.splitext(docx_filename)[0] + '.pdf'
+async def convert_with_adobe(docx_filename, pdf_filename, deadline):
+    """Adobe PDF Services: token, upload URI (usually pre-allocated), upload, createpdf, poll, download, delete."""
     base_url = CONFIG['BASE_URL']
     client_id = CONFIG['CLIENT_ID']
     client_secret = CONFIG['CLIENT_SECRET']
@@ -157,19 +430,154 @@ def main_converter(docx_filename, output_filename):
     if client_id == UNINITIALIZED_VALUE or client_secret == UNINITIALIZED_VALUE:
         raise Exception("Client ID or Secret not set")
 
-    access_token = get_access_token(client_id, client_secret, base_url)
-    upload_url, asset_id = get_upload_uri(access_token, client_id, base_url)
-    upload_docx(upload_url, docx_filename)
-    location = create_pdf(access_token, client_id, asset_id, base_url)
-    download_uri = retrieve_pdf(access_token, client_id, location)
+    global _conversion_slots
+    if _conversion_slots is None:
+        # Created on the loop thread so it binds to the conversion loop
+        _conversion_slots = asyncio.Semaphore(MAX_CONCURRENT_CONVERSIONS)
+
+    async with _conversion_slots:
+        access_token = await _run_blocking(get_access_token, client_id, client_secret, base_url)
+        # take() may queue expired entries for deletion (a SQLite write): keep it off the loop thread
+        preallocated = await _run_blocking(upload_uri_pool.take)
+        if preallocated:
+            upload_url, asset_id = preallocated
+        else:
+            access_token, upload_url, asset_id = await _new_upload_uri(access_token, deadline)
+        try:
+            try:
+                await _run_blocking(upload_docx, upload_url, docx_filename, deadline)
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if not preallocated or status is None or not 400 <= status < 500:
+                    raise
+                # The pre-allocated URI expired or was revoked: upload once to a fresh asset
+                print(f"⚠️ Pre-allocated upload URI rejected ({status}), requesting a new one")
+                await _run_blocking(asset_cleanup.enqueue, asset_id)
+                access_token, upload_url, asset_id = await _new_upload_uri(access_token, deadline)
+                await _run_blocking(upload_docx, upload_url, docx_filename, deadline)
+            deadline.check("createpdf")
+            location = await _run_blocking(create_pdf, access_token, client_id, asset_id, base_url, deadline)
+            download_uri = await retrieve_pdf_async(access_token, client_id, location, deadline)
+            deadline.check("download")
+            await _run_blocking(download_pdf, download_uri, pdf_filename, deadline)
+        finally:
+            # Deleting the asset is not worth a round trip for the user; failed jobs are cleaned up too
+            await _run_blocking(asset_cleanup.enqueue, asset_id)
+
+
+async def _new_upload_uri(access_token, deadline):
+    """(access token, upload URI, asset ID) from POST /assets, refreshing a rejected token once."""
+    try:
+        upload_url, asset_id = await _run_blocking(get_upload_uri, access_token, CONFIG['CLIENT_ID'],
+                                                   CONFIG['BASE_URL'], deadline)
+    except requests.exceptions.HTTPError as e:
+        if e.response is None or e.response.status_code != 401:
+            raise
+        # Cached token was revoked or expired early: fetch a new one and retry once
+        token_provider.invalidate(access_token)
+        access_token = await _run_blocking(get_access_token, CONFIG['CLIENT_ID'], CONFIG['CLIENT_SECRET'],
+                                           CONFIG['BASE_URL'])
+        upload_url, asset_id = await _run_blocking(get_upload_uri, access_token, CONFIG['CLIENT_ID'],
+                                                   CONFIG['BASE_URL'], deadline)
+    return access_token, upload_url, asset_id
+
+
+async def convert_with_libreoffice(docx_filename, pdf_filename, deadline):
+    """Local headless LibreOffice through the warm soffice pool."""
+    await _run_blocking(soffice_pool.convert, docx_filename, pdf_filename, max(deadline.remaining(), 1))
+
+
+# Backend name -> coroutine(docx_filename, pdf_filename, deadline); chosen per document
+# type through PDF_CONVERTER_BACKENDS in load_config
+CONVERTER_BACKENDS = {
+    "adobe": convert_with_adobe,
+    "libreoffice": convert_with_libreoffice,
+}
+
+
+def converter_backend_for(doc_type=None):
+    return PDF_CONVERTER_BACKENDS.get(doc_type, PDF_CONVERTER_BACKENDS.get("default", "adobe"))
+
+
+# Used instead when the primary backend is unavailable (PDF API circuit open)
+FALLBACK_BACKENDS = {
+    "adobe": "libreoffice",
+}
+
+
+def _fallback_for(backend):
+    fallback = FALLBACK_BACKENDS.get(backend)
+    if fallback == "libreoffice" and not soffice_pool.available():
+        return None
+    return fallback
+
+
+async def main_converter_async(docx_filename, output_filename, timeout=CONVERSION_TIMEOUT_SECONDS,
+                               doc_type=None, backend=None, priority="interactive"):
+    """Convert one DOCX to PDF; must run on the loop returned by _get_loop()."""
+    deadline = Deadline(timeout)
+    conversion_priority.set(priority)
+    if output_filename == "":
+        output_filename = os.path.splitext(docx_filename)[0] + '.pdf'
+    backend = backend or converter_backend_for(doc_type)
+    if backend == "adobe" and api_breaker.state() == "open" and _fallback_for(backend):
+        print(f"⚠️ PDF API circuit open, converting with {_fallback_for(backend)} instead")
+        backend = _fallback_for(backend)
+
+    # Same rendered document converted before by this backend: no conversion at all
+    try:
+        cache_key = await _run_blocking(docx_fingerprint, docx_filename, backend)
+    except Exception as e:
+        print(f"⚠️ Could not fingerprint {docx_filename}, skipping the conversion cache: {e}")
+        cache_key = None
+    if cache_key and await _run_blocking(conversion_cache.get, cache_key, output_filename):
+        print(f"PDF served from conversion cache: {output_filename}")
+        return output_filename
+
+    try:
+        await CONVERTER_BACKENDS[backend](docx_filename, output_filename, deadline)
+    except CircuitOpenError:
+        fallback = _fallback_for(backend)
+        if not fallback:
+            raise
+        print(f"⚠️ PDF API circuit opened during conversion, retrying with {fallback}")
+        backend = fallback
+        cache_key = cache_key and await _run_blocking(docx_fingerprint, docx_filename, backend)
+        await CONVERTER_BACKENDS[backend](docx_filename, output_filename, deadline)
     pdf_filename = output_filename
-    download_pdf(download_uri, pdf_filename)
-    delete_asset(access_token, client_id, asset_id, base_url)
-    print(f"PDF generated successfully: {pdf_filename}")
+    if cache_key:
+        await _run_blocking(conversion_cache.put, cache_key, pdf_filename)
+    print(f"PDF generated successfully: {pdf_filename} ({backend})")
+    return pdf_filename
+
+
+def main_converter(docx_filename, output_filename, timeout=CONVERSION_TIMEOUT_SECONDS, doc_type=None, backend=None,
+                   priority="interactive"):
+    """Blocking wrapper around main_converter_async for the Streamlit handlers.
+
+    priority ("interactive", "admin" or "background") orders waiting calls in the API rate limiter.
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        main_converter_async(docx_filename, output_filename, timeout, doc_type, backend, priority), _get_loop())
+    return future.result()
+
+
+def convert_many(jobs, timeout=CONVERSION_TIMEOUT_SECONDS, doc_type=None, backend=None, priority="interactive"):
+    """Convert (docx_filename, output_filename) pairs concurrently.
+
+    At most MAX_CONCURRENT_CONVERSIONS run at once; returns one result per job in
+    order, either the PDF path or the exception that job raised.
+    """
+    async def run_all():
+        return await asyncio.gather(
+            *(main_converter_async(docx, pdf, timeout, doc_type, backend, priority) for docx, pdf in jobs),
+            return_exceptions=True
+        )
+
+    return asyncio.run_coroutine_threadsafe(run_all(), _get_loop()).result()
 
 
 # if __name__ == "__main__":
 #     main_converter("Generated_Contract.docx")
 
 # main_converter("Generated_Contract_105.docx")
-
@@ -0,0 +1,109 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from docxtpl import DocxTemplate
+from jinja2 import Environment, FileSystemBytecodeCache, FunctionLoader
+
+# Shared cache behind the docxtpl editors (nda_edit, offer_edit, relieve_edit,
+# internship_edit, invoice_edit).
+# Each render still gets a fresh DocxTemplate (docxtpl mutates the document tree
+# while rendering, so a parsed tree cannot be shared), but the expensive steps -
+# patching the Jinja tags in the XML and compiling it - are memoized by the content
+# hash of the XML. Compiled templates live in one shared Environment backed by an
+# on-disk bytecode cache that survives restarts.
+
+PATCHED_XML_CACHE_SIZE = 128  # body/header/footer parts, several per template
+JINJA_BYTECODE_DIR = os.path.join(tempfile.gettempdir(), "hvt_jinja_bytecode")
+
+
+class _LRU:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+_patched_xml = _LRU(PATCHED_XML_CACHE_SIZE)
+_pending_sources = threading.local()
+
+
+class _CachingEnvironment(Environment):
+    """Environment whose from_string() reuses compiled templates for identical sources."""
+
+    def from_string(self, source, globals=None, template_class=None):
+        name = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        _pending_sources.source = (name, source)
+        try:
+            return self.get_template(name, globals=globals)
+        finally:
+            _pending_sources.source = None
+
+
+def _load_pending_source(name):
+    # Names are content hashes, so a cached template is always up to date
+    pending = getattr(_pending_sources, "source", None)
+    if pending and pending[0] == name:
+        return pending[1], None, lambda: True
+    return None
+
+
+os.makedirs(JINJA_BYTECODE_DIR, exist_ok=True)
+jinja_env = _CachingEnvironment(
+    loader=FunctionLoader(_load_pending_source),
+    bytecode_cache=FileSystemBytecodeCache(JINJA_BYTECODE_DIR),
+    cache_size=PATCHED_XML_CACHE_SIZE,
+)
+
+
+class CachedDocxTemplate(DocxTemplate):
+    def patch_xml(self, src_xml):
+        key = hashlib.sha1(src_xml.encode("utf-8")).hexdigest()
+        patched = _patched_xml.get(key)
+        if patched is None:
+            patched = super().patch_xml(src_xml)
+            _patched_xml.put(key, patched)
+        return patched
+
+
+def load_template(input_path):
+    """Fresh CachedDocxTemplate over an in-memory copy of input_path."""
+    with open(input_path, "rb") as f:
+        return CachedDocxTemplate(io.BytesIO(f.read()))
+
+
+def render_docx(input_path, output_path, context):
+    """Fill input_path with context and save it to output_path, through the shared caches."""
+    doc = load_template(input_path)
+    doc.render(context, jinja_env)
+    doc.save(output_path)
+
+
+def template_cache_stats():
+    lookups = _patched_xml.hits + _patched_xml.misses
+    return {
+        "hits": _patched_xml.hits,
+        "misses": _patched_xml.misses,
+        "hit_ratio": _patched_xml.hits / lookups if lookups else 0.0,
+    }
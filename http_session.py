@@ -0,0 +1,90 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Shared keep-alive HTTP session for the PDF conversion pipeline.
+# A conversion touches three hosts (PDF Services API, the upload and the download
+# storage endpoints); reusing pooled connections saves a TCP+TLS handshake per step.
+# Transient failures are retried by urllib3 with backoff, honoring Retry-After.
+# Read errors and retryable statuses are only retried for idempotent methods: a POST
+# (/token, /assets, /operation/createpdf) may already have been processed, and
+# resending it creates duplicate assets or jobs. Connect errors are retried for every
+# method, since the request never left.
+
+POOL_CONNECTIONS = 8  # number of hosts kept in the pool manager
+POOL_MAXSIZE = 16  # keep-alive connections per host, sized for concurrent sessions
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 60
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+RETRY_POLICY = Retry(
+    total=4,
+    connect=3,
+    read=2,
+    status=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset({"GET", "PUT", "DELETE"}),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+
+class TimeoutSession(requests.Session):
+    """Session that applies DEFAULT_TIMEOUT to every request without an explicit one."""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        return super().request(method, url, **kwargs)
+
+
+def header_md5(headers):
+    """Base64 MD5 of the whole object from Content-MD5 or GCS's x-goog-hash, or None."""
+    if headers.get("Content-MD5"):
+        return headers["Content-MD5"]
+    for part in headers.get("x-goog-hash", "").split(","):
+        part = part.strip()
+        if part.startswith("md5="):
+            return part[len("md5="):]
+    return None
+
+
+def build_session(pool_maxsize=POOL_MAXSIZE, retries=RETRY_POLICY):
+    session = TimeoutSession()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=pool_maxsize, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+
+def pool_stats():
+    """Per-host connection pool counters of the shared session."""
+    stats = {}
+    if _session is None:
+        return stats
+    for adapter in {id(a): a for a in _session.adapters.values()}.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle": pool.pool.qsize() if pool.pool else 0,
+                "maxsize": pool.pool.maxsize if pool.pool else 0,
+            }
+    return stats
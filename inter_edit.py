@@ -1,4 +1,4 @@
-from docxtpl import DocxTemplate
+from docx_template_cache import render_docx
 
 
 def internship_edit(input_path, output_path, context):
@@ -10,13 +10,7 @@ def internship_edit(input_path, output_path, context):
     else:
         a_ = {"a": "a"}
         context.update(a_)
-    # Load the template
-    doc = DocxTemplate(input_path)
-    # Render the template
-    doc.render(context)
-
-    # Save the filled document
-    doc.save(output_path)
+    render_docx(input_path, output_path, context)
 
     print(f"{output_path} has been created!")
 
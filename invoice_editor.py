@@ -309,8 +309,7 @@ def add_payment_details_section(output_path, line_length=None, line_bold=True, l
 #     print(f"{output_path} has been created!")
 
 
-from docxtpl import DocxTemplate
-from jinja2 import Environment
+from docx_template_cache import load_template, jinja_env
 from num2words import num2words  # ✅ Import number-to-words converter
 
 def sum_filter(values):
@@ -318,7 +317,7 @@ def sum_filter(values):
 
 def invoice_edit(input_path, output_path, context):
     import re
-    doc = DocxTemplate(input_path)
+    doc = load_template(input_path)
 
     # Sum payment_description prices
     # total_price = 0
@@ -342,8 +341,7 @@ def invoice_edit(input_path, output_path, context):
     # context["sum"] = f"{total_price:,}"
     # context["sum_to_word"] = num2words(total_price, to="cardinal", lang="en").title()  # e.g. "Fifty Thousand"
 
-    # Render
-    jinja_env = Environment()
+    # Render with the shared caching environment
     # jinja_env.filters['sum'] = sum_filter
     doc.render(context, jinja_env)
     doc.save(output_path)
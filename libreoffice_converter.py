@@ -0,0 +1,260 @@
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from conversion_errors import ConversionTimeoutError
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+except ImportError:  # LibreOffice's Python bindings are not installed: convert through the CLI
+    uno = None
+
+# Local DOCX -> PDF backend driving headless LibreOffice.
+# A small pool of soffice processes is kept warm, each with its own user profile
+# (so jobs on different workers never share state) and, when the UNO bindings are
+# available, listening on its own (free) local port so a conversion is a document load + export
+# instead of a full process start. Without UNO each job runs `soffice --convert-to`
+# against the worker's pre-initialized profile. A supervisor thread restarts workers
+# whose process died; a worker is also recycled after a failed or timed out job and
+# every SOFFICE_MAX_JOBS_PER_PROCESS conversions.
+
+SOFFICE_BINARY = shutil.which("soffice") or shutil.which("libreoffice") or "soffice"
+SOFFICE_POOL_SIZE = 2
+SOFFICE_START_TIMEOUT = 30
+SOFFICE_JOB_TIMEOUT = 60
+SOFFICE_MAX_JOBS_PER_PROCESS = 200
+SOFFICE_SUPERVISOR_INTERVAL = 10
+SOFFICE_PROFILE_ROOT = os.path.join(tempfile.gettempdir(), "hvt_soffice")
+
+
+def _free_port():
+    # Several processes (app, job worker, benchmarks) run their own pools side by side
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _prop(name, value):
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+class SofficeWorker:
+    def __init__(self, index):
+        self.index = index
+        self.port = None
+        # Per process too: a profile is locked by the soffice instance using it
+        self.profile_dir = os.path.join(SOFFICE_PROFILE_ROOT, f"{os.getpid()}_worker_{index}")
+        self.process = None
+        self.desktop = None
+        self.jobs = 0
+        self.busy = False
+        self.restarts = 0
+
+    def _profile_url(self):
+        return "file://" + os.path.abspath(self.profile_dir).replace(os.sep, "/")
+
+    def start(self):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        self.jobs = 0
+        if uno is None:
+            # CLI mode: initialize the profile once so later --convert-to runs start faster
+            if not os.path.exists(os.path.join(self.profile_dir, "user")):
+                subprocess.run([SOFFICE_BINARY, "--headless", "--norestore", "--terminate_after_init",
+                                f"-env:UserInstallation={self._profile_url()}"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               timeout=SOFFICE_START_TIMEOUT)
+            return
+
+        self.port = _free_port()
+        self.process = subprocess.Popen(
+            [SOFFICE_BINARY, "--headless", "--invisible", "--nologo", "--norestore", "--nodefault",
+             f"-env:UserInstallation={self._profile_url()}",
+             f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context)
+        started = time.monotonic()
+        while True:
+            try:
+                context = resolver.resolve(
+                    f"uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext")
+                break
+            except Exception:
+                if self.process.poll() is not None or time.monotonic() - started > SOFFICE_START_TIMEOUT:
+                    self.stop()
+                    raise RuntimeError(f"soffice worker {self.index} did not start")
+                time.sleep(0.25)
+        self.desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+
+    def alive(self):
+        if uno is None:
+            return True
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self):
+        self.desktop = None
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    def restart(self):
+        self.stop()
+        self.restarts += 1
+        self.start()
+
+    def convert(self, docx_filename, pdf_filename, timeout):
+        if uno is None:
+            self._convert_cli(docx_filename, pdf_filename, timeout)
+        else:
+            self._convert_uno(docx_filename, pdf_filename, timeout)
+        self.jobs += 1
+
+    def _convert_uno(self, docx_filename, pdf_filename, timeout):
+        # A hung export is only interrupted by killing the process; the pool restarts it
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            if self.process:
+                self.process.kill()
+
+        watchdog = threading.Timer(timeout, kill)
+        watchdog.start()
+        try:
+            document = self.desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(os.path.abspath(docx_filename)), "_blank", 0,
+                (_prop("Hidden", True), _prop("ReadOnly", True)))
+            try:
+                document.storeToURL(uno.systemPathToFileUrl(os.path.abspath(pdf_filename)),
+                                    (_prop("FilterName", "writer_pdf_Export"),))
+            finally:
+                document.close(True)
+        except Exception:
+            if timed_out.is_set():
+                raise ConversionTimeoutError(f"LibreOffice conversion took longer than {timeout:.0f}s")
+            raise
+        finally:
+            watchdog.cancel()
+
+    def _convert_cli(self, docx_filename, pdf_filename, timeout):
+        # Separate output directory per job so concurrent jobs never see each other's files
+        out_dir = tempfile.mkdtemp(prefix="soffice_job_")
+        try:
+            try:
+                subprocess.run(
+                    [SOFFICE_BINARY, "--headless", "--norestore", f"-env:UserInstallation={self._profile_url()}",
+                     "--convert-to", "pdf:writer_pdf_Export", "--outdir", out_dir, os.path.abspath(docx_filename)],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout, check=True,
+                )
+            except subprocess.TimeoutExpired:
+                raise ConversionTimeoutError(f"LibreOffice conversion took longer than {timeout:.0f}s")
+            produced = os.path.join(out_dir, os.path.splitext(os.path.basename(docx_filename))[0] + ".pdf")
+            if not os.path.exists(produced):
+                raise RuntimeError(f"LibreOffice produced no PDF for {docx_filename}")
+            shutil.move(produced, pdf_filename)
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+
+class SofficePool:
+    def __init__(self, size=SOFFICE_POOL_SIZE):
+        self.size = size
+        self.workers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self.conversions = 0
+        self.failures = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._started:
+                return
+            if not self.available():
+                raise RuntimeError(f"LibreOffice binary not found ({SOFFICE_BINARY})")
+            self.workers = [SofficeWorker(i) for i in range(self.size)]
+            for worker in self.workers:
+                worker.start()
+                self._idle.put(worker)
+            threading.Thread(target=self._supervise, name="soffice-supervisor", daemon=True).start()
+            self._started = True
+
+    def _supervise(self):
+        while True:
+            time.sleep(SOFFICE_SUPERVISOR_INTERVAL)
+            # Only idle workers are checked, and each is taken out of the queue while it is,
+            # so a conversion can never claim a worker the supervisor is restarting
+            for _ in range(self._idle.qsize()):
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if not worker.alive():
+                    print(f"⚠️ soffice worker {worker.index} died, restarting")
+                    try:
+                        worker.restart()
+                    except Exception as e:
+                        print(f"❌ Could not restart soffice worker {worker.index}: {e}")
+                self._idle.put(worker)
+
+    def convert(self, docx_filename, pdf_filename, timeout=SOFFICE_JOB_TIMEOUT):
+        self._ensure_started()
+        started = time.monotonic()
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise ConversionTimeoutError("No LibreOffice worker became free in time")
+
+        worker.busy = True
+        try:
+            if not worker.alive():
+                worker.restart()
+            remaining = max(timeout - (time.monotonic() - started), 1)
+            worker.convert(docx_filename, pdf_filename, remaining)
+            with self._lock:
+                self.conversions += 1
+            if worker.jobs >= SOFFICE_MAX_JOBS_PER_PROCESS:
+                worker.restart()
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            # The process may be wedged after a failure; start it fresh
+            try:
+                worker.restart()
+            except Exception as e:
+                print(f"❌ Could not restart soffice worker {worker.index}: {e}")
+            raise
+        finally:
+            worker.busy = False
+            self._idle.put(worker)
+        return pdf_filename
+
+    def available(self):
+        return shutil.which(SOFFICE_BINARY) is not None
+
+    def stats(self):
+        return {
+            "mode": "uno" if uno is not None else "cli",
+            "workers": len(self.workers),
+            "idle": self._idle.qsize(),
+            "conversions": self.conversions,
+            "failures": self.failures,
+            "restarts": sum(worker.restarts for worker in self.workers),
+        }
+
+
+soffice_pool = SofficePool()
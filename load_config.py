@@ -2,3 +2,17 @@
 
 
 LOAD_LOCALLY = False
+
+# Warm the template catalog, blobs and preview thumbnails in the background on startup
+WARMUP_ON_START = False
+
+# Also keep converted PDFs in Cloud Storage so every instance can reuse them
+SHARED_CONVERSION_CACHE = False
+
+# PDF converter per document type ("adobe" or "libreoffice"); "default" covers the rest
+PDF_CONVERTER_BACKENDS = {
+    "default": "adobe",
+}
+
+# Run document generation in the background worker process (conversion_jobs.py)
+BACKGROUND_CONVERSIONS = True
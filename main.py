@@ -6,15 +6,29 @@ from dotenv import load_dotenv
 from firebase_conf import auth, rt_db, bucket, firestore_db
 from document_handlers import (handle_internship_certificate, handle_internship_offer, handle_relieving_letter,
                                handle_nda,
-                               handle_contract, handle_proposal, handle_invoice)
+                               handle_contract, handle_proposal, handle_invoice,
+                               fetch_and_organize_templates)
 from google.cloud import firestore
 from google.cloud.firestore_v1 import SERVER_TIMESTAMP
 import tempfile
-import pdfplumber
+from pdf_preview import render_pages
 from apscheduler.schedulers.background import BackgroundScheduler
 from manage_internship_roles_tab import manage_internship_roles_tab
-from docx_pdf_converter import main_converter
-from load_config import LOAD_LOCALLY
+from docx_pdf_converter import main_converter, token_provider, polling_stats, asset_cleanup, upload_uri_pool, \
+    status_poll_latency, pdf_download_latency
+from template_downloader import template_download_latency
+from api_guard import api_limiter, api_breaker
+from http_session import pool_stats
+from conversion_cache import conversion_cache
+from docx_template_cache import template_cache_stats
+from libreoffice_converter import soffice_pool
+from load_config import LOAD_LOCALLY, WARMUP_ON_START, BACKGROUND_CONVERSIONS
+from conversion_jobs import conversion_jobs, ensure_worker
+from template_catalog import invalidate_templates, invalidate_all_templates, get_blob_index
+from check_placeholders import extract_placeholders, index_placeholders, PLACEHOLDERS_FIELD, DOCX_MIME
+from blob_cache import fetch_blob
+from warmup import start_warmup, warmup_stats
+from thumbnails import upload_thumbnails, thumbnails_for_template, THUMBNAILS_FIELD
 
 load_dotenv()
 
@@ -32,13 +46,16 @@ def cleanup_broken_metadata():
             templates_ref = firestore_db.collection("HVT_DOC_Gen").document(doc_type.id).collection("templates")
             docs = templates_ref.stream()
 
+            # One prefix listing per document type instead of an exists() call per template
+            blob_index = get_blob_index(doc_type.id, refresh=True)
+
             for doc in docs:
                 data = doc.to_dict()
                 if 'storage_path' in data:
-                    blob = bucket.blob(data['storage_path'])
-                    if not blob.exists():
+                    if data['storage_path'] not in blob_index:
                         st.warning(f"Deleting broken Firestore doc: {data.get('original_name', doc.id)}")
                         templates_ref.document(doc.id).delete()
+                        invalidate_templates(doc_type.id)
 
     except Exception as e:
         st.error(f"Error during metadata cleanup: {str(e)}")
@@ -49,6 +66,17 @@ scheduler = BackgroundScheduler()
 scheduler.add_job(cleanup_broken_metadata, 'cron', hour=2)
 scheduler.start()
 
+# Delete Adobe assets left queued by a previous run
+asset_cleanup.start()
+
+# Document generation jobs run in a separate worker process
+if BACKGROUND_CONVERSIONS:
+    ensure_worker()
+
+# Pre-warm the caches once per process without blocking the UI
+if WARMUP_ON_START:
+    start_warmup()
+
 # Initialize session state
 if 'user' not in st.session_state:
     st.session_state.user = None
@@ -269,8 +297,17 @@ if selected_option == "Admin Panel":
                                             with open(temp_docx, 'wb') as f:
                                                 f.write(uploaded_file.getvalue())
 
+                                            # Record which variables the template expects
+                                            file_details[PLACEHOLDERS_FIELD] = extract_placeholders(temp_docx)
+
                                             # Convert to PDF
-                                            main_converter(temp_docx, temp_pdf)
+                                            main_converter(temp_docx, temp_pdf, doc_type=doc_type, priority="admin")
+
+                                            # Small first-page images for the template galleries (the template is saved without them on failure)
+                                            try:
+                                                file_details[THUMBNAILS_FIELD] = upload_thumbnails(bucket, temp_pdf, storage_path)
+                                            except Exception as e:
+                                                st.warning(f"Could not generate thumbnails: {str(e)}")
 
                                             # Upload PDF version
                                             pdf_storage_path = f"HVT_DOC_Gen/{doc_type.lower().replace(' ', '_')}/pdf_previews/{display_name.replace(' ', '_')}.pdf"
@@ -314,11 +351,20 @@ if selected_option == "Admin Panel":
                                             if os.path.exists(temp_pdf):
                                                 os.remove(temp_pdf)
 
+                                if file_extension.lower() == 'pdf':
+                                    try:
+                                        file_details[THUMBNAILS_FIELD] = upload_thumbnails(
+                                            bucket, uploaded_file.getvalue(), storage_path)
+                                    except Exception as e:
+                                        st.warning(f"Could not generate thumbnails: {str(e)}")
+
                                 # Save to Firestore
                                 if doc_type == "Proposal":
                                     template_ref.collection(normalized_subdir).add(file_details)
+                                    invalidate_templates(doc_type, normalized_subdir)
                                 else:
                                     template_ref.collection("templates").add(file_details)
+                                    invalidate_templates(doc_type)
 
                                 st.success(f"Template '{display_name}' saved successfully!")
                                 # st.markdown(f"**Download Link:** [Click here]({download_url})")
@@ -585,26 +631,23 @@ if selected_option == "Admin Panel":
         st.subheader("Manage Templates")
         from streamlit_sortables import sort_items
         import streamlit as st
-        import pdfplumber
 
 
         def preview_pdf_all_pages(pdf_path: str):
             try:
-                with pdfplumber.open(pdf_path) as pdf:
-                    for i, page in enumerate(pdf.pages):
-                        preview_image = page.to_image(resolution=100)
-                        if LOAD_LOCALLY:
-                            st.image(
-                                preview_image.original,
-                                caption=f"Page {i + 1}",
-                                use_column_width=True
-                            )
-                        else:
-                            st.image(
-                                preview_image.original,
-                                caption=f"Page {i + 1}",
-                                use_container_width=True
-                            )
+                for i, preview_image in render_pages(pdf_path, dpi=100):
+                    if LOAD_LOCALLY:
+                        st.image(
+                            preview_image,
+                            caption=f"Page {i + 1}",
+                            use_column_width=True
+                        )
+                    else:
+                        st.image(
+                            preview_image,
+                            caption=f"Page {i + 1}",
+                            use_container_width=True
+                        )
             except Exception as e:
                 st.warning(f"Could not preview PDF: {str(e)}")
 
@@ -728,7 +771,10 @@ if selected_option == "Admin Panel":
                                         if 'pdf_storage_path' in template_data:
                                             pdf_blob = bucket.blob(template_data['pdf_storage_path'])
                                             pdf_blob.delete()
+                                        for thumbnail_path in (template_data.get(THUMBNAILS_FIELD) or {}).values():
+                                            bucket.blob(thumbnail_path).delete()
                                         template_ref.collection(section_key).document(doc_id).delete()
+                                        invalidate_templates(doc_type, section_key)
                                         st.success("Template deleted successfully")
                                         st.experimental_rerun() if LOAD_LOCALLY else st.rerun()
                                     except Exception as e:
@@ -768,15 +814,20 @@ if selected_option == "Admin Panel":
                                                     os.makedirs(temp_dir, exist_ok=True)
 
                                                     # Create temp file paths
-                                                    temp_docx = os.path.join(temp_dir, f"regenerate_{doc_id}.docx")
                                                     temp_pdf = os.path.join(temp_dir, f"preview_{doc_id}.pdf")
 
-                                                    # Download original DOCX
-                                                    blob = bucket.blob(template_data['storage_path'])
-                                                    blob.download_to_filename(temp_docx)
+                                                    # Original DOCX comes from the shared blob cache
+                                                    source_docx = fetch_blob(bucket, template_data['storage_path'],
+                                                                             get_blob_index(doc_type).generation(template_data['storage_path']))
 
                                                     # Convert to PDF
-                                                    main_converter(temp_docx, temp_pdf)
+                                                    main_converter(source_docx, temp_pdf, doc_type=doc_type, priority="admin")
+
+                                                    # Thumbnails from the fresh PDF (the cached copy at pdf_storage_path is the old one)
+                                                    try:
+                                                        update_data[THUMBNAILS_FIELD] = upload_thumbnails(bucket, temp_pdf, template_data['storage_path'])
+                                                    except Exception as e:
+                                                        st.warning(f"Could not generate thumbnails: {str(e)}")
 
                                                     # Upload PDF version
                                                     clean_name = new_display_name or template_data.get('display_name',
@@ -808,14 +859,23 @@ if selected_option == "Admin Panel":
                                                 st.exception(e)
                                             finally:
                                                 # Clean up temp files if they exist
-                                                if os.path.exists(temp_docx):
-                                                    os.remove(temp_docx)
                                                 if os.path.exists(temp_pdf):
                                                     os.remove(temp_pdf)
 
+                                        # Older templates without a new preview get their thumbnails from the stored PDF
+                                        if THUMBNAILS_FIELD not in template_data and "pdf_storage_path" not in update_data:
+                                            try:
+                                                thumbnails = thumbnails_for_template(bucket, {**template_data, **update_data},
+                                                                                     get_blob_index(doc_type))
+                                                if thumbnails:
+                                                    update_data[THUMBNAILS_FIELD] = thumbnails
+                                            except Exception as e:
+                                                st.warning(f"Could not generate thumbnails: {str(e)}")
+
                                         # Update Firestore document
                                         try:
                                             template_ref.collection(section_key).document(doc_id).update(update_data)
+                                            invalidate_templates(doc_type, section_key)
                                             st.session_state[f"edit_mode_{doc_id}"] = False
                                             st.success("Metadata updated successfully")
                                             st.experimental_rerun() if LOAD_LOCALLY else st.rerun()
@@ -855,12 +915,10 @@ if selected_option == "Admin Panel":
 
                                 if preview_url:
                                     try:
-                                        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                                            blob = bucket.blob(template_data[
-                                                                   'pdf_storage_path'] if 'pdf_storage_path' in template_data else
-                                                               template_data['storage_path'])
-                                            blob.download_to_filename(tmp_file.name)
-                                            preview_pdf_all_pages(tmp_file.name)
+                                        preview_storage_path = template_data.get('pdf_storage_path', template_data['storage_path'])
+                                        preview_path = fetch_blob(bucket, preview_storage_path,
+                                                                  get_blob_index(doc_type).generation(preview_storage_path))
+                                        preview_pdf_all_pages(preview_path)
                                     except Exception as e:
                                         st.warning(f"❌ Could not load preview: {str(e)}")
                                 else:
@@ -949,7 +1007,10 @@ if selected_option == "Admin Panel":
                                     if 'pdf_storage_path' in template_data:
                                         pdf_blob = bucket.blob(template_data['pdf_storage_path'])
                                         pdf_blob.delete()
+                                    for thumbnail_path in (template_data.get(THUMBNAILS_FIELD) or {}).values():
+                                        bucket.blob(thumbnail_path).delete()
                                     template_ref.collection("templates").document(doc_id).delete()
+                                    invalidate_templates(doc_type)
                                     st.success("Template deleted successfully")
                                     st.experimental_rerun() if LOAD_LOCALLY else st.rerun()
                                 except Exception as e:
@@ -972,6 +1033,14 @@ if selected_option == "Admin Panel":
                                         "visibility": new_vis,
                                         "last_updated": firestore.SERVER_TIMESTAMP
                                     }
+                                    if (template_data.get('file_type') == DOCX_MIME and
+                                            PLACEHOLDERS_FIELD not in template_data):
+                                        try:
+                                            source_docx = fetch_blob(bucket, template_data['storage_path'],
+                                                                     get_blob_index(doc_type).generation(template_data['storage_path']))
+                                            update_data[PLACEHOLDERS_FIELD] = extract_placeholders(source_docx)
+                                        except Exception as e:
+                                            st.warning(f"Could not read template placeholders: {str(e)}")
                                     if (doc_type != "Proposal" and
                                             template_data[
                                                 'file_type'] == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' and
@@ -984,15 +1053,20 @@ if selected_option == "Admin Panel":
                                                 os.makedirs(temp_dir, exist_ok=True)
 
                                                 # Create temp file paths
-                                                temp_docx = os.path.join(temp_dir, f"regenerate_{doc_id}.docx")
                                                 temp_pdf = os.path.join(temp_dir, f"preview_{doc_id}.pdf")
 
-                                                # Download original DOCX
-                                                blob = bucket.blob(template_data['storage_path'])
-                                                blob.download_to_filename(temp_docx)
+                                                # Original DOCX comes from the shared blob cache
+                                                source_docx = fetch_blob(bucket, template_data['storage_path'],
+                                                                         get_blob_index(doc_type).generation(template_data['storage_path']))
 
                                                 # Convert to PDF
-                                                main_converter(temp_docx, temp_pdf)
+                                                main_converter(source_docx, temp_pdf, doc_type=doc_type, priority="admin")
+
+                                                # Thumbnails from the fresh PDF (the cached copy at pdf_storage_path is the old one)
+                                                try:
+                                                    update_data[THUMBNAILS_FIELD] = upload_thumbnails(bucket, temp_pdf, template_data['storage_path'])
+                                                except Exception as e:
+                                                    st.warning(f"Could not generate thumbnails: {str(e)}")
 
                                                 # Upload PDF version
                                                 clean_name = new_display_name or template_data.get('display_name',
@@ -1024,14 +1098,23 @@ if selected_option == "Admin Panel":
                                             st.exception(e)
                                         finally:
                                             # Clean up temp files if they exist
-                                            if os.path.exists(temp_docx):
-                                                os.remove(temp_docx)
                                             if os.path.exists(temp_pdf):
                                                 os.remove(temp_pdf)
 
+                                    # Older templates without a new preview get their thumbnails from the stored PDF
+                                    if THUMBNAILS_FIELD not in template_data and "pdf_storage_path" not in update_data:
+                                        try:
+                                            thumbnails = thumbnails_for_template(bucket, {**template_data, **update_data},
+                                                                                 get_blob_index(doc_type))
+                                            if thumbnails:
+                                                update_data[THUMBNAILS_FIELD] = thumbnails
+                                        except Exception as e:
+                                            st.warning(f"Could not generate thumbnails: {str(e)}")
+
                                     # Update Firestore document
                                     try:
                                         template_ref.collection("templates").document(doc_id).update(update_data)
+                                        invalidate_templates(doc_type)
                                         st.session_state[f"edit_mode_{doc_id}"] = False
                                         st.success("Metadata updated successfully")
                                         st.experimental_rerun() if LOAD_LOCALLY else st.rerun()
@@ -1062,12 +1145,10 @@ if selected_option == "Admin Panel":
 
                             if preview_url:
                                 try:
-                                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                                        blob = bucket.blob(template_data[
-                                                               'pdf_storage_path'] if 'pdf_storage_path' in template_data else
-                                                           template_data['storage_path'])
-                                        blob.download_to_filename(tmp_file.name)
-                                        preview_pdf_all_pages(tmp_file.name)
+                                    preview_storage_path = template_data.get('pdf_storage_path', template_data['storage_path'])
+                                    preview_path = fetch_blob(bucket, preview_storage_path,
+                                                              get_blob_index(doc_type).generation(preview_storage_path))
+                                    preview_pdf_all_pages(preview_path)
                                 except Exception as e:
                                     st.warning(f"❌ Could not load preview: {str(e)}")
                             else:
@@ -1261,6 +1342,133 @@ if selected_option == "Admin Panel":
         #      # "Proposal",
         #      "Internship Positions"
         #      ])
+        with st.expander("⚙️ PDF Conversion Service"):
+            token_stats = token_provider.stats()
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Token cache hit ratio", f"{token_stats['hit_ratio']:.0%}",
+                        help=f"{token_stats['hits']} hits / {token_stats['misses']} misses")
+            col2.metric("Token refreshes", token_stats["refreshes"],
+                        help=f"{token_stats['refresh_failures']} failed")
+            col3.metric("Token valid for", f"{token_stats['expires_in_seconds'] / 60:.0f} min")
+
+            job_stats = polling_stats()
+            if job_stats["jobs"]:
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Conversion p50", f"{job_stats['p50_seconds']:.1f}s",
+                            help=f"{job_stats['jobs']} recent jobs")
+                col2.metric("Conversion p95", f"{job_stats['p95_seconds']:.1f}s",
+                            help=f"max {job_stats['max_seconds']:.1f}s")
+                col3.metric("Status polls per job", f"{job_stats['mean_polls']:.1f}")
+
+            cache_stats = conversion_cache.stats()
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Conversions saved by cache", cache_stats["conversions_saved"],
+                        help=f"{cache_stats['shared_hits']} from the shared storage tier")
+            col2.metric("Conversion cache hit ratio", f"{cache_stats['hit_ratio']:.0%}")
+            col3.metric("Conversions sent to the API", cache_stats["misses"])
+
+            docx_cache_stats = template_cache_stats()
+            col1, col2, col3 = st.columns(3)
+            col1.metric("DOCX template cache hit ratio", f"{docx_cache_stats['hit_ratio']:.0%}",
+                        help=f"{docx_cache_stats['hits']} hits / {docx_cache_stats['misses']} misses")
+
+            breaker_stats = api_breaker.stats()
+            col1, col2, col3 = st.columns(3)
+            col1.metric("PDF API circuit", breaker_stats["state"].replace("_", " "),
+                        help=f"{breaker_stats['consecutive_failures']} consecutive 429/5xx responses")
+            col2.metric("Circuit trips", breaker_stats["trips"])
+            col3.metric("Calls rejected while open", breaker_stats["rejected"])
+            st.table([{"priority": priority, **counters} for priority, counters in api_limiter.stats().items()])
+
+            queue_stats = conversion_jobs.stats()
+            st.markdown("**Generation queue** " + ("(worker running)" if queue_stats["worker_running"] else "(⚠️ no worker)"))
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Queued jobs", queue_stats["queued"],
+                        help=f"{queue_stats['running']} running, {queue_stats['failed']} failed")
+            col2.metric("Oldest queued job", f"{queue_stats['oldest_queued_seconds']:.0f}s")
+            col3.metric("Queue wait p50 / p95",
+                        f"{queue_stats['wait_p50_seconds']:.1f}s / {queue_stats['wait_p95_seconds']:.1f}s")
+
+            upload_pool_stats = upload_uri_pool.stats()
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Pre-allocated upload URIs", f"{upload_pool_stats['size']}/{upload_pool_stats['target']}")
+            col2.metric("Upload URI pool hit ratio", f"{upload_pool_stats['hit_ratio']:.0%}",
+                        help=f"{upload_pool_stats['hits']} hits / {upload_pool_stats['misses']} misses")
+            col3.metric("Upload URIs retired unused", upload_pool_stats["expired"],
+                        help=f"{upload_pool_stats['fetch_failures']} failed pre-allocations")
+
+            cleanup_stats = asset_cleanup.stats()
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Assets awaiting deletion", cleanup_stats["pending"])
+            col2.metric("Assets deleted", cleanup_stats["deleted"],
+                        help=f"{cleanup_stats['failures']} failed attempts")
+            col3.metric("Assets given up on", cleanup_stats["dropped"])
+
+            st.markdown("**Hedged requests**")
+            st.table([{"request": tracker.name, **tracker.stats()}
+                      for tracker in (status_poll_latency, pdf_download_latency, template_download_latency)])
+
+            st.markdown("**Connection pools**")
+            pools = pool_stats()
+            if pools:
+                st.table([{"host": host, **counters} for host, counters in pools.items()])
+            else:
+                st.caption("No conversion requests made by this process yet.")
+
+            soffice_stats = soffice_pool.stats()
+            if soffice_stats["workers"]:
+                st.markdown(f"**LibreOffice pool** ({soffice_stats['mode']})")
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Idle workers", f"{soffice_stats['idle']}/{soffice_stats['workers']}")
+                col2.metric("LibreOffice conversions", soffice_stats["conversions"],
+                            help=f"{soffice_stats['failures']} failed")
+                col3.metric("Worker restarts", soffice_stats["restarts"])
+
+        with st.expander("🧩 Template Placeholders"):
+            st.caption("Stores the variables each DOCX template expects so forms are checked before rendering.")
+            recompute = st.checkbox("Recompute for templates that already have a schema", key="recompute_placeholders")
+            if st.button("Index template placeholders"):
+                with st.spinner("Reading templates..."):
+                    updated, failed = index_placeholders(
+                        firestore_db, bucket,
+                        ["Internship Certificate", "Internship Offer", "Relieving Letter", "Project Invoice",
+                         "Project Contract", "Project NDA"],
+                        only_missing=not recompute
+                    )
+                invalidate_all_templates()
+                st.success(f"Placeholder schema stored for {updated} template(s)")
+                for name in failed:
+                    st.warning(f"Could not index {name}")
+
+        with st.expander("🔥 Cache Warmup"):
+            stats = warmup_stats()
+            st.write(f"Status: **{stats['status']}** ({stats['elapsed_seconds']:.1f}s)")
+            st.progress(stats["progress"])
+
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Catalog hit ratio", f"{stats['catalog']['hit_ratio']:.0%}",
+                        help=f"{stats['catalog']['hits']} hits / {stats['catalog']['misses']} misses")
+            col2.metric("Blob cache hit ratio", f"{stats['blob_cache']['hit_ratio']:.0%}",
+                        help=f"{stats['blob_cache']['hits']} hits / {stats['blob_cache']['misses']} misses")
+            col3.metric("Live catalog listeners", stats["catalog"]["live_listeners"])
+
+            for error in stats["errors"]:
+                st.warning(error)
+
+            if stats["status"] != "running" and st.button("Run warmup now"):
+                start_warmup(again=True)
+                st.experimental_rerun() if LOAD_LOCALLY else st.rerun()
+
+        with st.expander("📂 Template Mirror"):
+            st.caption("Download every template to a local folder; unchanged templates are skipped.")
+            if st.button("Mirror all templates"):
+                try:
+                    with st.spinner("Downloading templates..."):
+                        mirror_dir = fetch_and_organize_templates(firestore_db)
+                    st.success(f"Templates mirrored to {mirror_dir}")
+                except Exception as e:
+                    st.error(f"Failed to mirror templates: {str(e)}")
+
         tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs(
             ["Internship Certificate",
              "Internship Offer",
@@ -1334,22 +1542,21 @@ elif selected_option == "History" and st.session_state.get('is_admin', False):
 
     def pdf_view(file_input):
         try:
-            with pdfplumber.open(file_input) as pdf:
-                st.subheader("Preview")
-                for i, page in enumerate(pdf.pages):
-                    if LOAD_LOCALLY:
-                        st.image(
-                            page.to_image(resolution=150).original,
-                            caption=f"Page {i + 1}",
-                            use_column_width=True
-                        )
-                    else:
-                        st.image(
-                            page.to_image(resolution=150).original,
-                            caption=f"Page {i + 1}",
-                            use_container_width=True
-                        )
-                    # AS_DOC_Gen
+            st.subheader("Preview")
+            for i, image in render_pages(file_input):
+                if LOAD_LOCALLY:
+                    st.image(
+                        image,
+                        caption=f"Page {i + 1}",
+                        use_column_width=True
+                    )
+                else:
+                    st.image(
+                        image,
+                        caption=f"Page {i + 1}",
+                        use_container_width=True
+                    )
+            # AS_DOC_Gen
 
         except Exception as e:
             st.warning(f"Couldn't generate PDF preview: {str(e)}")
@@ -1434,10 +1641,15 @@ elif selected_option == "History" and st.session_state.get('is_admin', False):
                                     if tmp_path.endswith('.pdf'):
                                         pdf_view(tmp_path)
                                     elif tmp_path.endswith('.docx'):
-                                        with tempfile.NamedTemporaryFile(suffix="pdf", delete=False) as pdf_tmp_file:
+                                        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as pdf_tmp_file:
                                             pdf_tmp_path = pdf_tmp_file.name
-                                            main_converter(tmp_path, pdf_tmp_path)
-                                            pdf_view(pdf_tmp_file)
+                                        # The converter replaces the file at pdf_tmp_path, so preview by path
+                                        try:
+                                            main_converter(tmp_path, pdf_tmp_path, doc_type=doc_type)
+                                            pdf_view(pdf_tmp_path)
+                                        finally:
+                                            if os.path.exists(pdf_tmp_path):
+                                                os.unlink(pdf_tmp_path)
                                 else:
                                     st.error("Downloaded file not found!")
 
@@ -0,0 +1,320 @@
+import argparse
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the Adobe PDF Services endpoints used by docx_pdf_converter.py:
+# /token, /assets (+ upload PUT, download GET, DELETE), /operation/createpdf and its
+# status URL. Latency and job durations are drawn from log-normal distributions and
+# errors can be injected, so the pipeline can be load tested and profiled offline.
+# Point the app at it with ADOBE_BASE_URL=http://127.0.0.1:<port> (plus any
+# ADOBE_CLIENT_ID / ADOBE_CLIENT_SECRET). With --libreoffice and soffice installed the
+# returned PDFs are real conversions, otherwise a one-page placeholder PDF.
+
+MOCK_DEFAULT_PORT = 8765
+
+
+class MockOptions:
+    def __init__(self, latency_ms=40.0, latency_sigma=0.5, job_seconds=2.0, job_sigma=0.4,
+                 error_rate=0.0, throttle_rate=0.0, truncate_rate=0.0, token_ttl=86400,
+                 libreoffice=False):
+        self.latency_ms = latency_ms  # median per-request latency
+        self.latency_sigma = latency_sigma
+        self.job_seconds = job_seconds  # median createpdf job duration
+        self.job_sigma = job_sigma
+        self.error_rate = error_rate  # share of requests answered with 503
+        self.throttle_rate = throttle_rate  # share answered with 429 + Retry-After
+        self.truncate_rate = truncate_rate  # share of downloads cut off half way
+        self.token_ttl = token_ttl
+        self.libreoffice = libreoffice
+
+
+def _lognormal(median, sigma):
+    return random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+
+def placeholder_pdf(text):
+    """Minimal valid one-page PDF showing text."""
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    stream = f"BT /F1 18 Tf 72 720 Td ({text}) Tj ET".encode("latin-1", "replace")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R"
+        b" /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+
+class MockState:
+    def __init__(self, options):
+        self.options = options
+        self.lock = threading.Lock()
+        self.tokens = {}  # token -> expires_at
+        self.assets = {}  # asset id -> bytes (None until uploaded)
+        self.jobs = {}  # job id -> {"ready_at", "output", "error"}
+        self.requests = 0
+        self.injected_errors = 0
+
+    def new_token(self):
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.tokens[token] = time.time() + self.options.token_ttl
+        return token
+
+    def token_valid(self, token):
+        with self.lock:
+            return self.tokens.get(token, 0) > time.time()
+
+    def start_job(self, asset_id):
+        job_id = uuid.uuid4().hex
+        job = {"ready_at": time.time() + _lognormal(self.options.job_seconds, self.options.job_sigma),
+               "output": None, "error": None}
+        with self.lock:
+            self.jobs[job_id] = job
+            source = self.assets[asset_id]
+
+        if self.options.libreoffice:
+            threading.Thread(target=self._convert, args=(job, source), daemon=True).start()
+        else:
+            job["output"] = placeholder_pdf(f"Mock PDF for asset {asset_id}")
+        return job_id
+
+    def _convert(self, job, source):
+        from libreoffice_converter import soffice_pool
+
+        work_dir = tempfile.mkdtemp(prefix="mock_pdf_")
+        try:
+            docx_path = os.path.join(work_dir, "input.docx")
+            pdf_path = os.path.join(work_dir, "output.pdf")
+            with open(docx_path, "wb") as f:
+                f.write(source)
+            soffice_pool.convert(docx_path, pdf_path)
+            with open(pdf_path, "rb") as f:
+                job["output"] = f.read()
+        except Exception as e:
+            job["error"] = str(e)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def stats(self):
+        with self.lock:
+            return {"requests": self.requests, "injected_errors": self.injected_errors,
+                    "assets": len(self.assets), "jobs": len(self.jobs)}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real service
+    state = None  # set by start_mock_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None, content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _authorized(self):
+        token = self.headers.get("Authorization", "").replace("Bearer ", "", 1)
+        if self.state.token_valid(token):
+            return True
+        self._send(401, {"error": {"code": "Unauthorized"}})
+        return False
+
+    def _simulate(self):
+        """Latency and injected failures; returns False when a failure was sent."""
+        options = self.state.options
+        with self.state.lock:
+            self.state.requests += 1
+        time.sleep(_lognormal(options.latency_ms, options.latency_sigma) / 1000)
+        roll = random.random()
+        if roll < options.error_rate:
+            with self.state.lock:
+                self.state.injected_errors += 1
+            self._send(503, {"error": {"code": "ServiceUnavailable"}})
+            return False
+        if roll < options.error_rate + options.throttle_rate:
+            with self.state.lock:
+                self.state.injected_errors += 1
+            self._send(429, {"error": {"code": "TooManyRequests"}}, {"Retry-After": "1"})
+            return False
+        return True
+
+    def _base_url(self):
+        return f"http://{self.headers.get('Host')}"
+
+    def do_POST(self):
+        body = self._body()
+        if not self._simulate():
+            return
+        if self.path == "/token":
+            self._send(200, {"access_token": self.state.new_token(), "token_type": "bearer",
+                             "expires_in": self.state.options.token_ttl})
+        elif self.path == "/assets":
+            if not self._authorized():
+                return
+            asset_id = f"urn:aaid:mock:{uuid.uuid4()}"
+            with self.state.lock:
+                self.state.assets[asset_id] = None
+            self._send(200, {"uploadUri": f"{self._base_url()}/upload/{asset_id}", "assetID": asset_id})
+        elif self.path == "/operation/createpdf":
+            if not self._authorized():
+                return
+            asset_id = json.loads(body or b"{}").get("assetID")
+            with self.state.lock:
+                uploaded = self.state.assets.get(asset_id) is not None
+            if not uploaded:
+                self._send(400, {"error": {"code": "InvalidInput", "message": "asset not uploaded"}})
+                return
+            job_id = self.state.start_job(asset_id)
+            self._send(201, headers={"Location": f"{self._base_url()}/operation/createpdf/{job_id}/status"})
+        else:
+            self._send(404, {"error": {"code": "NotFound"}})
+
+    def do_PUT(self):
+        body = self._body()
+        if not self._simulate():
+            return
+        match = re.fullmatch(r"/upload/(.+)", self.path)
+        with self.state.lock:
+            known = match is not None and match.group(1) in self.state.assets
+            if known:
+                self.state.assets[match.group(1)] = body
+        self._send(200 if known else 404)
+
+    def do_GET(self):
+        if not self._simulate():
+            return
+        status_match = re.fullmatch(r"/operation/createpdf/(\w+)/status", self.path)
+        download_match = re.fullmatch(r"/download/(\w+)", self.path)
+        if status_match:
+            if not self._authorized():
+                return
+            job = self.state.jobs.get(status_match.group(1))
+            if job is None:
+                self._send(404, {"error": {"code": "NotFound"}})
+            elif job["error"]:
+                self._send(200, {"status": "failed", "error": {"code": "ConversionFailed", "message": job["error"]}})
+            elif job["output"] is None or time.time() < job["ready_at"]:
+                self._send(200, {"status": "in progress"})
+            else:
+                self._send(200, {"status": "done", "asset": {
+                    "assetID": status_match.group(1),
+                    "downloadUri": f"{self._base_url()}/download/{status_match.group(1)}",
+                }})
+        elif download_match:
+            job = self.state.jobs.get(download_match.group(1))
+            if job is None or job["output"] is None:
+                self._send(404, content_type="text/plain")
+                return
+            self._download(job["output"])
+        else:
+            self._send(404, {"error": {"code": "NotFound"}})
+
+    def _download(self, pdf):
+        start = 0
+        range_match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if range_match and int(range_match.group(1)) < len(pdf):
+            start = int(range_match.group(1))
+        body = pdf[start:]
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Accept-Ranges", "bytes")
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(pdf) - 1}/{len(pdf)}")
+        else:
+            self.send_header("Content-MD5", base64.b64encode(hashlib.md5(pdf).digest()).decode("ascii"))
+        self.end_headers()
+        if random.random() < self.state.options.truncate_rate and len(body) > 1:
+            # Drop the connection half way to exercise resumed downloads
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def do_DELETE(self):
+        if not self._simulate():
+            return
+        if not self._authorized():
+            return
+        match = re.fullmatch(r"/assets/(.+)", self.path)
+        with self.state.lock:
+            found = match is not None and self.state.assets.pop(match.group(1), False) is not False
+        self._send(204 if found else 404)
+
+
+def start_mock_server(port=MOCK_DEFAULT_PORT, options=None):
+    """Serve the mock API on a background thread; returns (server, base_url)."""
+    state = MockState(options or MockOptions())
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, name="mock-pdf-services", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def add_mock_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="median request latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--job-seconds", type=float, default=2.0, help="median createpdf job duration")
+    parser.add_argument("--job-sigma", type=float, default=0.4)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests failing with 429")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="share of downloads cut off")
+    parser.add_argument("--token-ttl", type=int, default=86400)
+    parser.add_argument("--libreoffice", action="store_true", help="return real PDFs converted by LibreOffice")
+
+
+def mock_options_from_args(args):
+    return MockOptions(args.latency_ms, args.latency_sigma, args.job_seconds, args.job_sigma, args.error_rate,
+                       args.throttle_rate, args.truncate_rate, args.token_ttl, args.libreoffice)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Adobe PDF Services stand-in")
+    parser.add_argument("--port", type=int, default=MOCK_DEFAULT_PORT)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(args.port, mock_options_from_args(args))
+    print(f"Mock PDF Services listening on {base_url} (export ADOBE_BASE_URL={base_url})")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"Mock PDF Services: {server.state.stats()}")
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,14 +1,8 @@
-from docxtpl import DocxTemplate
+from docx_template_cache import render_docx
 
 
 def nda_edit(input_path, output_path, context):
-    # Load the template
-    doc = DocxTemplate(input_path)
-    # Render the template
-    doc.render(context)
-
-    # Save the filled document
-    doc.save(output_path)
+    render_docx(input_path, output_path, context)
 
     print(f"{output_path} has been created!")
 
@@ -0,0 +1,52 @@
+import fitz  # PyMuPDF
+from PIL import Image
+
+# Page previews for the Streamlit views, rendered with MuPDF's rasterizer.
+# pdfplumber's page.to_image() runs pdfminer's layout analysis on every page before
+# drawing it, which is wasted work when all we need is a picture. Pages are rendered
+# one at a time, so a long merged proposal never holds more than one pixmap.
+
+PREVIEW_DPI = 150
+PREVIEW_COLORSPACE = "RGB"
+PREVIEW_ALPHA = False
+
+_COLORSPACES = {"RGB": fitz.csRGB, "GRAY": fitz.csGRAY}
+_IMAGE_MODES = {("RGB", False): "RGB", ("RGB", True): "RGBA", ("GRAY", False): "L", ("GRAY", True): "LA"}
+
+
+def open_document(pdf_source):
+    """fitz document for a path, bytes, or a file-like object (uploaded file, BytesIO, mmap)."""
+    if isinstance(pdf_source, (bytes, bytearray)):
+        return fitz.open(stream=pdf_source, filetype="pdf")
+    if hasattr(pdf_source, "read"):
+        pdf_source.seek(0)
+        return fitz.open(stream=pdf_source.read(), filetype="pdf")
+    return fitz.open(pdf_source)
+
+
+def render_pixmap(page, dpi=PREVIEW_DPI, colorspace=PREVIEW_COLORSPACE, alpha=PREVIEW_ALPHA):
+    return page.get_pixmap(dpi=dpi, colorspace=_COLORSPACES[colorspace], alpha=alpha)
+
+
+def dpi_for_width(page, width):
+    """DPI at which the page renders width pixels wide."""
+    return width * 72 / page.rect.width
+
+
+def render_page(page, dpi=PREVIEW_DPI, colorspace=PREVIEW_COLORSPACE, alpha=PREVIEW_ALPHA):
+    """PIL image of one fitz page."""
+    pix = render_pixmap(page, dpi, colorspace, alpha)
+    return Image.frombytes(_IMAGE_MODES[(colorspace, alpha)], (pix.width, pix.height), pix.samples)
+
+
+def render_pages(pdf_source, dpi=PREVIEW_DPI, colorspace=PREVIEW_COLORSPACE, alpha=PREVIEW_ALPHA, start=0):
+    """(page index, PIL image) for each page from start onwards."""
+    with open_document(pdf_source) as pdf:
+        for i in range(start, pdf.page_count):
+            yield i, render_page(pdf[i], dpi, colorspace, alpha)
+
+
+def save_page_png(pdf_source, out_path, page_number=0, dpi=PREVIEW_DPI):
+    """Write one page as a PNG without going through PIL."""
+    with open_document(pdf_source) as pdf:
+        render_pixmap(pdf[page_number], dpi).save(out_path, output="png")
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+from blob_cache import FileLock
+from template_catalog import get_templates, get_blob_index
+
+# Long-lived local mirror of the Proposal section PDFs.
+# manifest.json maps storage path -> {"generation", "local_path", "section"}; a sync
+# only downloads blobs that are new or whose generation changed, and does nothing at
+# all when the cached catalog has not moved since the last sync in this process.
+
+PROPOSAL_MIRROR_DIR = os.path.join(tempfile.gettempdir(), "hvt_proposal_templates")
+PROPOSAL_SECTIONS = ("cover_page", "table_of_contents", "business_requirement", "page_3_6", "testimonials")
+MAX_DOWNLOAD_WORKERS = 8
+
+
+class ProposalTemplateMirror:
+    def __init__(self, root, bucket):
+        self.root = root
+        self.bucket = bucket
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self._lock = threading.Lock()
+        self._synced_state = None
+        os.makedirs(root, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_manifest(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".json.part")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _wanted(self):
+        """Storage path -> (section, generation) for every Proposal template in the catalog."""
+        blob_index = get_blob_index("Proposal")
+        wanted = {}
+        for section in PROPOSAL_SECTIONS:
+            for doc in get_templates("Proposal", section):
+                storage_path = doc.to_dict().get("storage_path")
+                if storage_path:
+                    wanted[storage_path] = (section, blob_index.generation(storage_path))
+        return wanted
+
+    def _local_path_for(self, section, storage_path):
+        digest = hashlib.sha1(storage_path.encode("utf-8")).hexdigest()[:12]
+        filename = os.path.basename(storage_path)
+        if not filename.lower().endswith(".pdf"):
+            filename += ".pdf"
+        return os.path.join(self.root, section, f"{digest}_{filename}")
+
+    def _download(self, storage_path, section, generation):
+        if generation is None:
+            # Path outside the listed prefix, resolve it directly
+            blob = self.bucket.get_blob(storage_path)
+            if blob is None:
+                raise FileNotFoundError(f"Blob not found: {storage_path}")
+            generation = blob.generation
+
+        local_path = self._local_path_for(section, storage_path)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(local_path), suffix=".part")
+        os.close(fd)
+        try:
+            self.bucket.blob(storage_path, generation=generation).download_to_filename(tmp_path)
+            os.replace(tmp_path, local_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return {"generation": generation, "local_path": local_path, "section": section}
+
+    def sync(self):
+        wanted = self._wanted()
+        state = tuple(sorted((path, section, str(gen)) for path, (section, gen) in wanted.items()))
+
+        with self._lock:
+            if state == self._synced_state:
+                return self
+
+            with FileLock(os.path.join(self.root, "manifest.lock")):
+                # Another process may have synced in the meantime
+                self.manifest = self._read_manifest()
+
+                failed = False
+                to_download = []
+                for storage_path, (section, generation) in wanted.items():
+                    entry = self.manifest.get(storage_path)
+                    if (
+                            entry
+                            and os.path.exists(entry["local_path"])
+                            and (generation is None or entry["generation"] == generation)
+                    ):
+                        continue
+                    to_download.append((storage_path, section, generation))
+
+                if to_download:
+                    with ThreadPoolExecutor(max_workers=MAX_DOWNLOAD_WORKERS) as pool:
+                        futures = {
+                            pool.submit(self._download, *item): item[0] for item in to_download
+                        }
+                        for future, storage_path in futures.items():
+                            try:
+                                self.manifest[storage_path] = future.result()
+                            except Exception as e:
+                                failed = True
+                                print(f"❌ Failed to download {storage_path}: {e}")
+
+                for storage_path in list(self.manifest):
+                    if storage_path not in wanted:
+                        stale = self.manifest.pop(storage_path)
+                        if os.path.exists(stale["local_path"]):
+                            os.remove(stale["local_path"])
+
+                self._write_manifest()
+
+            # Leave the state unset after a failure so the next rerun retries
+            self._synced_state = None if failed else state
+        return self
+
+    def local_path(self, storage_path):
+        entry = self.manifest.get(storage_path)
+        if entry and os.path.exists(entry["local_path"]):
+            return entry["local_path"]
+        return None
+
+
+class ProposalTemplateIndex:
+    """Immutable view of the Proposal templates with O(1) lookups.
+
+    by_section is keyed by proposal_section_type (what the wizard steps filter on),
+    by_pages by (section subcollection, num_pages).
+    """
+
+    def __init__(self, templates):
+        self.templates = tuple(MappingProxyType(tpl) for tpl in templates)
+        by_section = {}
+        by_pages = {}
+        for tpl in self.templates:
+            by_section.setdefault(tpl["proposal_section_type"], []).append(tpl)
+            by_pages.setdefault((tpl["section_key"], tpl["num_pages"]), []).append(tpl)
+        self.by_section = MappingProxyType({k: tuple(v) for k, v in by_section.items()})
+        self.by_pages = MappingProxyType({k: tuple(v) for k, v in by_pages.items()})
+
+    def __iter__(self):
+        return iter(self.templates)
+
+    def __len__(self):
+        return len(self.templates)
+
+    def section(self, section_type):
+        return self.by_section.get(section_type, ())
+
+    def with_pages(self, section_key, num_pages):
+        return self.by_pages.get((section_key, num_pages), ())
@@ -0,0 +1,231 @@
+import threading
+import time
+from firebase_conf import firestore_db, bucket
+
+# Process-wide cache of the HVT_DOC_Gen template catalog.
+# Every Streamlit session in this process reads from the same entries, so a rerun
+# costs no Firestore round trip. Entries are kept fresh by an on_snapshot listener;
+# when a listener cannot be attached the entry falls back to a TTL and is refreshed
+# in the background while the stale copy keeps being served.
+# Alongside the metadata we keep a blob existence index per document type, built
+# from a single list_blobs() call over the type's storage prefix.
+
+CATALOG_ROOT = "HVT_DOC_Gen"
+STALE_AFTER_SECONDS = 300  # TTL for entries without a live listener
+LIVE_STALE_AFTER_SECONDS = 3600  # safety net in case a listener dies silently
+
+
+class _CatalogEntry:
+    def __init__(self):
+        self.docs = None
+        self.loaded_at = 0.0
+        self.watch = None
+        self.refreshing = False
+        self.load_lock = threading.Lock()
+
+
+def storage_folder(doc_type):
+    """Storage folder used by the admin upload flow for a document type."""
+    if doc_type == "Proposal":
+        return "Proposal"
+    return doc_type.lower().replace(' ', '_')
+
+
+class BlobIndex:
+    """Names (and generations) of every blob under one document type's storage prefix."""
+
+    def __init__(self, bucket, prefix, blobs):
+        self._bucket = bucket
+        self.prefix = prefix
+        self.blobs = blobs
+
+    def __contains__(self, storage_path):
+        if storage_path.startswith(self.prefix):
+            return storage_path in self.blobs
+        # Legacy paths outside the listed prefix still need an explicit check
+        return self._bucket.blob(storage_path).exists()
+
+    def __len__(self):
+        return len(self.blobs)
+
+    def generation(self, storage_path):
+        """Generation seen in the listing, or None when the path was not listed."""
+        return self.blobs.get(storage_path)
+
+
+class TemplateCatalog:
+    def __init__(self, db, bucket):
+        self._db = db
+        self._bucket = bucket
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._indexes = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _query(self, doc_type, collection):
+        ref = self._db.collection(CATALOG_ROOT).document(doc_type).collection(collection)
+        if collection == "templates":
+            return ref.order_by("order", direction="ASCENDING")
+        return ref
+
+    def _entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _CatalogEntry()
+            return entry
+
+    def get_templates(self, doc_type, collection="templates"):
+        """Return the cached template snapshots for a document type (query order preserved)."""
+        key = (doc_type, collection)
+        entry = self._entry(key)
+
+        with self._lock:
+            if entry.docs is not None:
+                self.hits += 1
+                max_age = LIVE_STALE_AFTER_SECONDS if entry.watch else STALE_AFTER_SECONDS
+                if time.monotonic() - entry.loaded_at > max_age and not entry.refreshing:
+                    entry.refreshing = True
+                    threading.Thread(target=self._refresh, args=(key, entry), daemon=True).start()
+                return entry.docs
+
+        # Cold path: only one session per key hits Firestore, the others wait for it
+        with entry.load_lock:
+            if entry.docs is None:
+                with self._lock:
+                    self.misses += 1
+                self._load(key, entry)
+            return entry.docs
+
+    def _load(self, key, entry):
+        doc_type, collection = key
+        query = self._query(doc_type, collection)
+        docs = tuple(query.get())
+        with self._lock:
+            entry.docs = docs
+            entry.loaded_at = time.monotonic()
+            start_watch = entry.watch is None and self._entries.get(key) is entry
+
+        if start_watch:
+            try:
+                watch = query.on_snapshot(self._make_listener(key, entry))
+            except Exception as e:
+                print(f"⚠️ Could not attach catalog listener for {doc_type}/{collection}: {e}")
+                return
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    entry.watch = watch
+                else:
+                    # Invalidated while we were attaching
+                    watch.unsubscribe()
+
+    def _refresh(self, key, entry):
+        try:
+            with entry.load_lock:
+                self._load(key, entry)
+        except Exception as e:
+            print(f"⚠️ Catalog refresh failed for {key[0]}/{key[1]}: {e}")
+        finally:
+            with self._lock:
+                entry.refreshing = False
+
+    def _make_listener(self, key, entry):
+        def on_snapshot(docs, changes, read_time):
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    previous = {d.id: d.update_time for d in entry.docs or ()}
+                    entry.docs = tuple(docs)
+                    entry.loaded_at = time.monotonic()
+                    if previous != {d.id: d.update_time for d in entry.docs}:
+                        # Metadata moved, so the blobs behind it may have too
+                        self._indexes.pop(key[0], None)
+
+        return on_snapshot
+
+    def get_blob_index(self, doc_type, refresh=False):
+        """Return the cached BlobIndex for a document type, listing the prefix once."""
+        with self._lock:
+            entry = self._indexes.get(doc_type)
+            if entry is None or refresh:
+                entry = self._indexes[doc_type] = _CatalogEntry()
+            elif entry.docs is not None:
+                if time.monotonic() - entry.loaded_at > STALE_AFTER_SECONDS and not entry.refreshing:
+                    entry.refreshing = True
+                    threading.Thread(target=self._refresh_index, args=(doc_type, entry), daemon=True).start()
+                return entry.docs
+
+        with entry.load_lock:
+            if entry.docs is None:
+                self._load_index(doc_type, entry)
+            return entry.docs
+
+    def _load_index(self, doc_type, entry):
+        prefix = f"{CATALOG_ROOT}/{storage_folder(doc_type)}/"
+        blobs = {blob.name: blob.generation for blob in self._bucket.list_blobs(prefix=prefix)}
+        with self._lock:
+            entry.docs = BlobIndex(self._bucket, prefix, blobs)
+            entry.loaded_at = time.monotonic()
+
+    def _refresh_index(self, doc_type, entry):
+        try:
+            with entry.load_lock:
+                self._load_index(doc_type, entry)
+        except Exception as e:
+            print(f"⚠️ Blob index refresh failed for {doc_type}: {e}")
+        finally:
+            with self._lock:
+                entry.refreshing = False
+
+    def invalidate(self, doc_type, collection="templates"):
+        """Drop a cached entry so the next read reloads it; called after admin writes."""
+        with self._lock:
+            entry = self._entries.pop((doc_type, collection), None)
+            self._indexes.pop(doc_type, None)
+        if entry and entry.watch:
+            try:
+                entry.watch.unsubscribe()
+            except Exception as e:
+                print(f"⚠️ Could not detach catalog listener for {doc_type}/{collection}: {e}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = sum(1 for entry in self._entries.values() if entry.docs is not None)
+            watched = sum(1 for entry in self._entries.values() if entry.watch)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "live_listeners": watched,
+        }
+
+    def invalidate_all(self):
+        with self._lock:
+            keys = list(self._entries)
+        for doc_type, collection in keys:
+            self.invalidate(doc_type, collection)
+
+
+catalog = TemplateCatalog(firestore_db, bucket)
+
+
+def get_templates(doc_type, collection="templates"):
+    return catalog.get_templates(doc_type, collection)
+
+
+def get_blob_index(doc_type, refresh=False):
+    return catalog.get_blob_index(doc_type, refresh)
+
+
+def invalidate_templates(doc_type, collection="templates"):
+    catalog.invalidate(doc_type, collection)
+
+
+def invalidate_all_templates():
+    catalog.invalidate_all()
+
+
+def catalog_stats():
+    return catalog.stats()
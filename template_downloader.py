@@ -0,0 +1,159 @@
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from deadlines import Deadline, LatencyTracker, hedged_call
+from http_session import header_md5
+
+# Bulk template downloader used to mirror the whole template set to a local folder.
+# Files are streamed in chunks straight to a temp file and published with an atomic
+# rename, so memory stays flat and a crashed download never leaves a half file behind.
+# A small manifest next to the files remembers size/md5/ETag/generation of the last
+# download: files whose storage generation is unchanged are skipped outright, the rest
+# are fetched with a conditional GET so an unchanged file costs a 304 and no body.
+
+DOWNLOAD_WORKERS = 8
+CHUNK_SIZE = 256 * 1024
+DOWNLOAD_TIMEOUT = (5, 60)  # (connect, read) seconds
+TEMPLATE_MIRROR_TIMEOUT_SECONDS = 180  # budget for a whole download_all() run
+# Fixed location so later runs find the manifest and skip unchanged templates
+TEMPLATE_MIRROR_DIR = os.path.join(tempfile.gettempdir(), "hvt_template_mirror")
+
+# Time to first byte of template GETs, shared by all downloaders for hedging
+template_download_latency = LatencyTracker("template_download")
+MANIFEST_NAME = ".download_manifest.json"
+
+
+class TemplateDownloader:
+    def __init__(self, base_dir, max_workers=DOWNLOAD_WORKERS):
+        self.base_dir = base_dir
+        self.max_workers = max_workers
+        self.manifest_path = os.path.join(base_dir, MANIFEST_NAME)
+        self._manifest_lock = threading.Lock()
+        self.session = requests.Session()
+        # One keep-alive connection per worker instead of a new TLS handshake per file
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        os.makedirs(base_dir, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_manifest(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.base_dir, suffix=".json.part")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _is_unchanged(self, file_path, url, generation):
+        entry = self.manifest.get(file_path)
+        if not entry or entry["url"] != url or not os.path.exists(file_path):
+            return False
+        if os.path.getsize(file_path) != entry["size"]:
+            return False
+        # A file edited in place keeps its size but gets a new generation; without one
+        # fall through to the conditional GET
+        return generation is not None and str(generation) == entry.get("generation")
+
+    def download(self, url, file_path, generation=None, deadline=None):
+        """Download one file; returns a result dict with status, bytes and timing."""
+        deadline = deadline or Deadline(TEMPLATE_MIRROR_TIMEOUT_SECONDS)
+        started = time.perf_counter()
+        result = {"path": file_path, "url": url, "bytes": 0}
+
+        with self._manifest_lock:
+            entry = self.manifest.get(file_path)
+            unchanged = self._is_unchanged(file_path, url, generation)
+        if unchanged:
+            result.update(status="skipped", seconds=time.perf_counter() - started)
+            return result
+
+        headers = {}
+        if entry and entry.get("etag") and os.path.exists(file_path):
+            headers["If-None-Match"] = entry["etag"]
+
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f, hedged_call(
+                    # Hedged: a second request races the first once it is slower than the usual response
+                    lambda: self.session.get(url, headers=headers, stream=True,
+                                             timeout=deadline.timeout("template download", *DOWNLOAD_TIMEOUT)),
+                    template_download_latency,
+                    deadline
+            ) as response:
+                if response.status_code == 304:
+                    result.update(status="not_modified", seconds=time.perf_counter() - started)
+                    return result
+                response.raise_for_status()
+
+                md5 = hashlib.md5()
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    md5.update(chunk)
+                    result["bytes"] += len(chunk)
+                    deadline.check("the end of the template download")
+
+                expected_md5 = header_md5(response.headers)
+                actual_md5 = base64.b64encode(md5.digest()).decode("ascii")
+                if expected_md5 and expected_md5 != actual_md5:
+                    raise IOError(f"MD5 mismatch for {url}")
+                etag = response.headers.get("ETag")
+                generation = response.headers.get("x-goog-generation") or generation
+
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        with self._manifest_lock:
+            self.manifest[file_path] = {
+                "url": url,
+                "size": result["bytes"],
+                "md5": actual_md5,
+                "etag": etag,
+                "generation": str(generation) if generation is not None else None,
+            }
+        result.update(status="downloaded", seconds=time.perf_counter() - started)
+        return result
+
+    def _safe_download(self, job, deadline):
+        try:
+            return self.download(*job, deadline=deadline)
+        except Exception as e:
+            return {"path": job[1], "url": job[0], "bytes": 0, "status": "failed", "error": str(e)}
+
+    def download_all(self, jobs, timeout=TEMPLATE_MIRROR_TIMEOUT_SECONDS):
+        """Download (url, file_path, storage generation or None) jobs on the bounded pool, all within timeout seconds."""
+        started = time.perf_counter()
+        deadline = Deadline(timeout)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(lambda job: self._safe_download(job, deadline), jobs))
+
+        with self._manifest_lock:
+            self._write_manifest()
+
+        for result in results:
+            name = os.path.basename(result["path"])
+            if result["status"] == "failed":
+                print(f"❌ Error downloading {name}: {result['error']}")
+            else:
+                print(f"{result['status']:>12} {name} ({result['bytes'] / 1024:.1f} KB, {result['seconds']:.2f}s)")
+
+        counts = {}
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        print(f"Template mirror finished in {time.perf_counter() - started:.2f}s: {counts}")
+        return results
@@ -0,0 +1,59 @@
+import io
+import os
+from PIL import Image
+from blob_cache import fetch_blob
+from pdf_preview import open_document, render_page, dpi_for_width
+
+# First-page thumbnails generated once when a template is uploaded or edited.
+# They are stored next to the template under <doc type folder>/thumbnails/ and
+# listed on the Firestore document as {"<width>": storage_path}, so the template
+# galleries only fetch a few KB per template instead of rasterizing the full preview.
+
+THUMBNAIL_WIDTHS = (160, 320, 640)
+GALLERY_THUMBNAIL_WIDTH = 320
+THUMBNAIL_FORMAT = "WEBP"
+THUMBNAIL_QUALITY = 80
+THUMBNAILS_FIELD = "thumbnails"
+
+
+def render_thumbnails(pdf_source, widths=THUMBNAIL_WIDTHS):
+    """Encoded first-page thumbnails of a PDF (path or bytes), one per width."""
+    with open_document(pdf_source) as pdf:
+        page = pdf[0]
+        # Render once at the largest width and downscale from there
+        image = render_page(page, dpi=dpi_for_width(page, max(widths)))
+
+    thumbnails = {}
+    for width in widths:
+        height = round(image.height * width / image.width)
+        buffer = io.BytesIO()
+        image.resize((width, height), Image.LANCZOS).save(buffer, format=THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY)
+        thumbnails[width] = buffer.getvalue()
+    return thumbnails
+
+
+def upload_thumbnails(bucket, pdf_source, template_storage_path):
+    """Render and upload the thumbnails for a template; returns the Firestore field value."""
+    folder, filename = os.path.split(template_storage_path)
+    # Keep thumbnails beside the templates folder (…/templates/x.docx -> …/thumbnails/x_320.webp)
+    base_folder = os.path.dirname(folder) if os.path.basename(folder) == "templates" else folder
+    name = os.path.splitext(filename)[0]
+    extension = THUMBNAIL_FORMAT.lower()
+
+    stored = {}
+    for width, data in render_thumbnails(pdf_source).items():
+        storage_path = f"{base_folder}/thumbnails/{name}_{width}.{extension}"
+        bucket.blob(storage_path).upload_from_string(data, content_type=f"image/{extension}")
+        stored[str(width)] = storage_path
+    return stored
+
+
+def thumbnails_for_template(bucket, template_data, blob_index):
+    """Thumbnails for an existing template, rendered from its PDF preview or the PDF itself."""
+    pdf_storage_path = template_data.get("pdf_storage_path")
+    if not pdf_storage_path and template_data.get("file_type") == "application/pdf":
+        pdf_storage_path = template_data["storage_path"]
+    if not pdf_storage_path:
+        return None
+    pdf_path = fetch_blob(bucket, pdf_storage_path, blob_index.generation(pdf_storage_path))
+    return upload_thumbnails(bucket, pdf_path, template_data["storage_path"])
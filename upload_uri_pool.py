@@ -0,0 +1,120 @@
+import math
+import threading
+import time
+from collections import deque
+
+# Pre-requested Adobe assets (assetID + pre-signed uploadUri) for the conversion pipeline.
+# A conversion takes one from here and starts uploading right away instead of waiting
+# for POST /assets. A background thread keeps the pool topped up to a target that
+# follows the recent conversion rate, and retires entries before their upload URI
+# expires (the unused assets are handed to the cleanup queue).
+
+UPLOAD_URI_MAX_AGE_SECONDS = 30 * 60  # retire entries well before the pre-signed URI expires
+UPLOAD_POOL_MIN_SIZE = 1
+UPLOAD_POOL_MAX_SIZE = 8
+UPLOAD_POOL_LEAD_SECONDS = 20  # keep enough URIs for this many seconds of conversions
+UPLOAD_POOL_RATE_WINDOW_SECONDS = 5 * 60
+UPLOAD_POOL_CHECK_SECONDS = 30
+UPLOAD_POOL_ERROR_BACKOFF_SECONDS = 15
+
+
+class UploadUriPool:
+    def __init__(self, fetch_upload_uri, discard_asset):
+        # fetch_upload_uri() -> (upload_url, asset_id); discard_asset(asset_id) for unused entries
+        self._fetch_upload_uri = fetch_upload_uri
+        self._discard_asset = discard_asset
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._entries = deque()  # (created_at, upload_url, asset_id), oldest first
+        self._takes = deque()  # monotonic times of recent take() calls
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.fetch_failures = 0
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="upload-uri-pool", daemon=True)
+                self._thread.start()
+
+    def take(self):
+        """A fresh (upload_url, asset_id), or None when the pool is empty."""
+        self._start()
+        now = time.monotonic()
+        entry = None
+        retired = []
+        with self._lock:
+            self._takes.append(now)
+            while self._entries:
+                created_at, upload_url, asset_id = self._entries.popleft()
+                if now - created_at < UPLOAD_URI_MAX_AGE_SECONDS:
+                    entry = (upload_url, asset_id)
+                    break
+                retired.append(asset_id)
+            if entry:
+                self.hits += 1
+            else:
+                self.misses += 1
+        self._retire(retired)
+        self._wakeup.set()
+        return entry
+
+    def _retire(self, asset_ids):
+        # Called without the lock: queueing for deletion writes to the cleanup database
+        with self._lock:
+            self.expired += len(asset_ids)
+        for asset_id in asset_ids:
+            try:
+                self._discard_asset(asset_id)
+            except Exception as e:
+                print(f"⚠️ Could not queue unused asset {asset_id} for deletion: {e}")
+
+    def target_size(self):
+        """Pool size for the conversion rate seen over the last few minutes."""
+        now = time.monotonic()
+        with self._lock:
+            while self._takes and now - self._takes[0] > UPLOAD_POOL_RATE_WINDOW_SECONDS:
+                self._takes.popleft()
+            rate = len(self._takes) / UPLOAD_POOL_RATE_WINDOW_SECONDS
+        return max(UPLOAD_POOL_MIN_SIZE, min(UPLOAD_POOL_MAX_SIZE, math.ceil(rate * UPLOAD_POOL_LEAD_SECONDS)))
+
+    def _run(self):
+        while True:
+            now = time.monotonic()
+            retired = []
+            with self._lock:
+                while self._entries and now - self._entries[0][0] >= UPLOAD_URI_MAX_AGE_SECONDS:
+                    retired.append(self._entries.popleft()[2])
+            self._retire(retired)
+            missing = self.target_size() - len(self._entries)
+
+            failed = False
+            for _ in range(max(missing, 0)):
+                try:
+                    upload_url, asset_id = self._fetch_upload_uri()
+                except Exception as e:
+                    self.fetch_failures += 1
+                    print(f"⚠️ Could not pre-allocate an upload URI: {e}")
+                    failed = True
+                    break
+                with self._lock:
+                    self._entries.append((time.monotonic(), upload_url, asset_id))
+
+            self._wakeup.wait(UPLOAD_POOL_ERROR_BACKOFF_SECONDS if failed else UPLOAD_POOL_CHECK_SECONDS)
+            self._wakeup.clear()
+
+    def stats(self):
+        target = self.target_size()
+        with self._lock:
+            takes = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "target": target,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / takes if takes else 0.0,
+                "expired": self.expired,
+                "fetch_failures": self.fetch_failures,
+            }
@@ -0,0 +1,126 @@
+import threading
+import time
+from firebase_conf import bucket
+from template_catalog import get_templates, get_blob_index, catalog_stats
+from blob_cache import fetch_blob, cached_first_page, blob_cache
+from proposal_mirror import ProposalTemplateMirror, PROPOSAL_MIRROR_DIR, PROPOSAL_SECTIONS
+
+# One-off background warmup of the caches the user flows read from.
+# Started from main.py when WARMUP_ON_START is set; it runs at most once per process
+# on a daemon thread (the Admin Panel can run it again, e.g. after templates change),
+# so the first session after a deploy finds the catalog, the Public template blobs,
+# their previews and first-page thumbnails already on the warm path.
+
+WARMUP_DOC_TYPES = (
+    "Internship Certificate",
+    "Internship Offer",
+    "Relieving Letter",
+    "Project Invoice",
+    "Project Contract",
+    "Project NDA",
+)
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class WarmupState:
+    def __init__(self):
+        self.status = "idle"  # idle -> running -> done / failed
+        self.started_at = None
+        self.finished_at = None
+        self.total = 0
+        self.done = 0
+        self.errors = []
+
+    def progress(self):
+        return self.done / self.total if self.total else 0.0
+
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+warmup_state = WarmupState()
+_start_lock = threading.Lock()
+
+
+def start_warmup(again=False):
+    """Start the warmup thread unless it already ran in this process (again=True: unless it is running)."""
+    with _start_lock:
+        if warmup_state.status == "running" or (warmup_state.status != "idle" and not again):
+            return False
+        warmup_state.status = "running"
+        warmup_state.started_at = time.time()
+        warmup_state.finished_at = None
+        warmup_state.total = 0
+        warmup_state.done = 0
+        warmup_state.errors = []
+    threading.Thread(target=_run, name="cache-warmup", daemon=True).start()
+    return True
+
+
+def _step(label, func, *args):
+    try:
+        return func(*args)
+    except Exception as e:
+        warmup_state.errors.append(f"{label}: {e}")
+        print(f"⚠️ Warmup failed for {label}: {e}")
+        return None
+    finally:
+        warmup_state.done += 1
+
+
+def _warm_doc_type(doc_type):
+    templates = get_templates(doc_type)
+    blob_index = get_blob_index(doc_type)
+
+    jobs = []
+    for t in templates:
+        data = t.to_dict()
+        storage_path = data.get("storage_path")
+        if data.get("visibility") != "Public" or data.get("file_type") != DOCX_MIME or not storage_path:
+            continue
+        if storage_path not in blob_index:
+            continue
+        jobs.append(storage_path)
+        if data.get("pdf_storage_path"):
+            jobs.append(data["pdf_storage_path"])
+
+    warmup_state.total += len(jobs)
+    for storage_path in jobs:
+        local_path = _step(storage_path, fetch_blob, bucket, storage_path, blob_index.generation(storage_path))
+        if local_path and storage_path.lower().endswith(".pdf"):
+            warmup_state.total += 1
+            _step(f"{storage_path} (thumbnail)", cached_first_page, local_path)
+
+
+def _run():
+    try:
+        # Catalog entries first: they are what every step 2 reads
+        warmup_state.total = len(WARMUP_DOC_TYPES) + len(PROPOSAL_SECTIONS) + 1
+        for doc_type in WARMUP_DOC_TYPES:
+            _step(doc_type, _warm_doc_type, doc_type)
+        for section in PROPOSAL_SECTIONS:
+            _step(f"Proposal/{section}", get_templates, "Proposal", section)
+
+        # Shares its manifest on disk with the mirror used by handle_proposal
+        _step("Proposal mirror", lambda: ProposalTemplateMirror(PROPOSAL_MIRROR_DIR, bucket).sync())
+        warmup_state.status = "done"
+    except Exception as e:
+        warmup_state.errors.append(str(e))
+        warmup_state.status = "failed"
+    finally:
+        warmup_state.finished_at = time.time()
+        print(f"Cache warmup {warmup_state.status} in {warmup_state.elapsed():.1f}s "
+              f"({len(warmup_state.errors)} errors)")
+
+
+def warmup_stats():
+    return {
+        "status": warmup_state.status,
+        "progress": warmup_state.progress(),
+        "elapsed_seconds": warmup_state.elapsed(),
+        "errors": list(warmup_state.errors),
+        "catalog": catalog_stats(),
+        "blob_cache": blob_cache.stats(),
+    }